@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+
+"""
+Structured access log for the registrar application. Each request is
+logged as one JSON object per line by a background thread, which
+buffers its writes and rotates the log file when it grows too large,
+so logging adds only a queue insertion to a request.
+
+Run as a script to analyze access logs: per-route latency histograms
+and percentiles, and the slowest queries.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import queue
+import argparse
+import threading
+from collections import defaultdict
+
+# Upper bounds, in milliseconds, of the latency histogram buckets; the
+# last bucket holds everything slower.
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Parameters whose values are search text, normalized for grouping.
+SEARCH_PARAMETERS = {"dept", "coursenum", "area", "title", "prof",
+                     "name", "prefix", "days", "bldg", "roomnum"}
+
+HISTOGRAM_WIDTH = 40
+
+
+def normalize_query(args):
+    """
+    Returns the query string of the request parameters args (a
+    MultiDict) in a canonical form: empty parameters dropped, search
+    text trimmed, lowercased and with runs of spaces collapsed, and
+    parameters sorted by name.
+    """
+    params = []
+    for name in sorted(args):
+        for value in args.getlist(name):
+            value = value.strip()
+            if name in SEARCH_PARAMETERS:
+                value = " ".join(value.lower().split())
+            if value != "":
+                params.append(f"{name}={value}")
+    return "&".join(params)
+
+
+class AccessLogWriter:
+    """
+    Writes log records as JSON lines to the file at path from a
+    background thread. Records are buffered and flushed at least every
+    flush_interval seconds; the file is rotated to path.1 (and older
+    files to path.2 and so on, keeping backups of them) once it
+    exceeds max_bytes. If more than max_pending records are waiting,
+    new ones are dropped and counted rather than blocking requests.
+    """
+
+    def __init__(self, path, max_bytes, backups, flush_interval=1.0,
+                 max_pending=10000):
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue(max_pending)
+        self.dropped = 0
+        self._file = open(path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="access-log")
+        self._thread.start()
+
+    def write(self, record):
+        """
+        Queues record (a dict) for writing without blocking.
+        """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """
+        Writes the queued records and closes the log file.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self._backups - 1, 0, -1):
+            older = f"{self._path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self._path}.{i + 1}")
+        if self._backups > 0:
+            os.replace(self._path, f"{self._path}.1")
+        else:
+            os.remove(self._path)
+        self._file = open(self._path, "a", encoding="utf-8")
+        self._size = 0
+
+    def _run(self):
+        deadline = time.monotonic() + self._flush_interval
+        while True:
+            try:
+                record = self._queue.get(
+                    timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                record = {}
+            if record is None:
+                break
+            if record:
+                line = json.dumps(record, separators=(",", ":"),
+                                  sort_keys=True) + "\n"
+                self._file.write(line)
+                self._size += len(line.encode("utf-8"))
+                if self._size >= self._max_bytes:
+                    self._rotate()
+            if time.monotonic() >= deadline:
+                self._file.flush()
+                deadline = time.monotonic() + self._flush_interval
+        self._file.close()
+
+
+def read_records(paths):
+    """
+    Yields the records of the access log files at paths, skipping
+    lines that are not JSON objects.
+    """
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and "total_ms" in record:
+                    yield record
+
+
+def percentile(ordered, fraction):
+    """
+    Returns the value at fraction (0 to 1) of the sorted list ordered,
+    by the nearest-rank method.
+    """
+    rank = max(1, math.ceil(len(ordered) * fraction))
+    return ordered[rank - 1]
+
+
+def histogram(latencies):
+    """
+    Returns the counts of latencies in each of the LATENCY_BUCKETS and
+    in the overflow bucket.
+    """
+    counts = [0] * (len(LATENCY_BUCKETS) + 1)
+    for latency in latencies:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    return counts
+
+
+def print_report(records, top, out=sys.stdout):
+    """
+    Prints the latency histogram and percentiles of each route and the
+    top slowest queries among records.
+    """
+    by_route = defaultdict(list)
+    for record in records:
+        by_route[record.get("route")].append(record)
+
+    for route in sorted(by_route, key=str):
+        latencies = sorted(r["total_ms"] for r in by_route[route])
+        print(f"{route}: {len(latencies)} requests, "
+              f"p50 {percentile(latencies, 0.5):.1f} ms, "
+              f"p90 {percentile(latencies, 0.9):.1f} ms, "
+              f"p99 {percentile(latencies, 0.99):.1f} ms, "
+              f"max {latencies[-1]:.1f} ms", file=out)
+        counts = histogram(latencies)
+        labels = [f"<= {bound} ms" for bound in LATENCY_BUCKETS]
+        labels.append(f"> {LATENCY_BUCKETS[-1]} ms")
+        most = max(counts)
+        for label, count in zip(labels, counts):
+            if count:
+                bar = "#" * max(1, count * HISTOGRAM_WIDTH // most)
+                print(f"  {label:>12} {count:8} {bar}", file=out)
+        print(file=out)
+
+    slowest = sorted((r for rs in by_route.values() for r in rs),
+                     key=lambda r: r["total_ms"], reverse=True)[:top]
+    print(f"Top {len(slowest)} slowest queries:", file=out)
+    for record in slowest:
+        query = record.get("query") or ""
+        print(f"  {record['total_ms']:9.1f} ms  {record.get('route')}"
+              f"{'?' + query if query else ''}  "
+              f"rows={record.get('rows')} bytes={record.get('bytes')} "
+              f"cache={record.get('cache')}", file=out)
+
+
+def main():
+    """
+    Prints a latency report of one or more access log files.
+    """
+    parser = argparse.ArgumentParser(
+        description="Analyze the registrar application's access logs")
+    parser.add_argument(
+        "logs", nargs="+", help="the access log files to analyze")
+    parser.add_argument(
+        "--top", type=int, default=20,
+        help="how many of the slowest queries to list "
+        "(default: %(default)s)")
+    args = parser.parse_args()
+    print_report(read_records(args.logs), args.top)
+
+
+if __name__ == "__main__":
+    main()
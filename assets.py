@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+
+"""
+Static asset pipeline for the registrar application. Builds the
+stylesheets and scripts that index.html uses from the sources in the
+assets directory: trims the vendored Bootstrap stylesheet down to the
+rules the page can use, minifies our own CSS and JavaScript, names
+every asset after a hash of its content, and precompresses it.
+
+Run as a script to write the built assets to a directory for
+inspection.
+"""
+
+import os
+import re
+import sys
+import gzip
+import hashlib
+import argparse
+import threading
+
+ASSETS_DIR = "assets"
+PAGE = "index.html"
+
+# Classes that Bootstrap's JavaScript adds at run time for the
+# components the page uses (the modal), so they never appear in the
+# page or our scripts.
+BOOTSTRAP_RUNTIME_CLASSES = {
+    "fade", "show", "modal-backdrop", "modal-open", "modal-static",
+}
+
+SOURCE_MAP = re.compile(r"/[*/]# sourceMappingURL=[^\n]*")
+
+
+class Asset:
+    """
+    One built asset: its content, a gzip-compressed copy of it, and
+    the content-hashed name it is served under.
+    """
+
+    def __init__(self, name, body, mimetype):
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        self.name = name
+        self.hashed_name = f"{stem}.{digest}{ext}"
+        self.etag = digest
+        self.body = body
+        self.gzip_body = gzip.compress(body, 9, mtime=0)
+        self.mimetype = mimetype
+
+
+def _split_css(css):
+    """
+    Splits css into its top-level statements. Each is a tuple of its
+    prelude (the selectors or at-rule) and its block content, which is
+    None for statements without a block such as @charset.
+    """
+    statements = []
+    depth = 0
+    quote = None
+    start = 0
+    brace = None
+    i = 0
+    while i < len(css):
+        ch = css[i]
+        if quote is not None:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            i = len(css) if end < 0 else end + 1
+        elif ch == "{":
+            if depth == 0:
+                brace = i
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                statements.append((css[start:brace].strip(),
+                                   css[brace + 1:i]))
+                start = i + 1
+        elif ch == ";" and depth == 0:
+            statements.append((css[start:i].strip(), None))
+            start = i + 1
+        i += 1
+    return statements
+
+
+def _strip_comments(css):
+    """
+    Removes comments from css, except /*! license comments.
+    """
+    return re.sub(r"/\*(?!!).*?\*/", "", css, flags=re.S)
+
+
+def _selector_used(selector, used):
+    """
+    Returns True if every class that selector requires is in used.
+    Classes inside :not(...) are not required.
+    """
+    required = re.sub(r":not\([^()]*\)", "", selector)
+    return all(name in used
+               for name in re.findall(r"\.(-?[_a-zA-Z][\w-]*)", required))
+
+
+def purge_css(css, used):
+    """
+    Returns css without the rules, and the selectors of rules, that
+    need a class not in the set used.
+    """
+    out = []
+    for prelude, block in _split_css(css):
+        comments = re.findall(r"/\*!.*?\*/", prelude, flags=re.S)
+        out.extend(comment + "\n" for comment in comments)
+        prelude = re.sub(r"/\*.*?\*/", "", prelude, flags=re.S).strip()
+        if block is None:
+            out.append(prelude + ";")
+        elif prelude.startswith(("@media", "@supports", "@container",
+                                 "@layer")):
+            inner = purge_css(block, used)
+            if inner:
+                out.append(prelude + "{" + inner + "}")
+        elif prelude.startswith("@"):
+            out.append(prelude + "{" + block + "}")
+        else:
+            selectors = [selector for selector in prelude.split(",")
+                         if _selector_used(selector, used)]
+            if selectors:
+                out.append(",".join(selectors) + "{" + block + "}")
+    return "".join(out)
+
+
+def minify_css(css):
+    """
+    Removes comments and unneeded whitespace from css.
+    """
+    css = _strip_comments(css)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def minify_js(js):
+    """
+    Removes comment lines, blank lines and indentation from js. Line
+    breaks are kept so that automatic semicolon insertion still works.
+    """
+    js = re.sub(r"^\s*/\*.*?\*/\s*$", "", js, flags=re.S | re.M)
+    lines = (line.strip() for line in js.splitlines())
+    return "\n".join(line for line in lines
+                     if line and not line.startswith("//")) + "\n"
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def build_assets(source_dir, page):
+    """
+    Builds the assets from source_dir that the page at path page uses
+    and returns them in a dict by their plain names.
+    """
+    app_js = _read(os.path.join(source_dir, "reg.js"))
+    used = set(re.findall(r"[\w-]+", _read(page) + app_js))
+    used |= BOOTSTRAP_RUNTIME_CLASSES
+
+    bootstrap_css = SOURCE_MAP.sub("", _read(
+        os.path.join(source_dir, "vendor", "bootstrap.min.css")))
+    app_css = (purge_css(bootstrap_css, used) + "\n"
+               + minify_css(_read(os.path.join(source_dir, "reg.css"))))
+    bootstrap_js = SOURCE_MAP.sub("", _read(
+        os.path.join(source_dir, "vendor", "bootstrap.min.js")))
+
+    assets = [
+        Asset("app.css", app_css.encode("utf-8"), "text/css"),
+        Asset("bootstrap.js", bootstrap_js.encode("utf-8"),
+              "text/javascript"),
+        Asset("reg.js", minify_js(app_js).encode("utf-8"),
+              "text/javascript"),
+    ]
+    return {asset.name: asset for asset in assets}
+
+
+def render_page(page, assets):
+    """
+    Returns the page at path page, with its references to assets
+    pointing at their content-hashed names, as an Asset.
+    """
+    html = _read(page)
+    for asset in assets.values():
+        html = html.replace(f"/assets/{asset.name}\"",
+                            f"/assets/{asset.hashed_name}\"")
+    return Asset(os.path.basename(page), html.encode("utf-8"),
+                 "text/html")
+
+
+class AssetPipeline:
+    """
+    The built assets and page, rebuilt whenever one of their source
+    files changes.
+    """
+
+    def __init__(self, source_dir=ASSETS_DIR, page=PAGE):
+        self._source_dir = source_dir
+        self._page = page
+        self._lock = threading.Lock()
+        self._signature = None
+        self._built = None
+
+    def _sources(self):
+        yield self._page
+        for root, _, files in os.walk(self._source_dir):
+            for name in files:
+                yield os.path.join(root, name)
+
+    def current(self):
+        """
+        Returns (page, assets) where page is the rendered page Asset
+        and assets maps both plain and hashed asset names to Assets.
+        """
+        signature = tuple(sorted(
+            (path, os.stat(path).st_mtime_ns) for path in self._sources()))
+        with self._lock:
+            if signature != self._signature:
+                assets = build_assets(self._source_dir, self._page)
+                page = render_page(self._page, assets)
+                by_name = dict(assets)
+                by_name.update((asset.hashed_name, asset)
+                               for asset in assets.values())
+                self._built = (page, by_name)
+                self._signature = signature
+            return self._built
+
+
+def main():
+    """
+    Builds the assets and writes them, with their gzip-compressed
+    copies and the rendered page, to a directory.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build the registrar application's static assets")
+    parser.add_argument(
+        "outdir", help="the directory to write the built assets to")
+    args = parser.parse_args()
+
+    page, by_name = AssetPipeline().current()
+    os.makedirs(args.outdir, exist_ok=True)
+    for asset in [page] + [a for n, a in by_name.items()
+                           if n == a.hashed_name]:
+        path = os.path.join(args.outdir, asset.hashed_name)
+        with open(path, "wb") as f:
+            f.write(asset.body)
+        with open(path + ".gz", "wb") as f:
+            f.write(asset.gzip_body)
+        print(f"{asset.hashed_name}: {len(asset.body)} bytes, "
+              f"{len(asset.gzip_body)} gzipped", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+    'use strict';
+
+
+    let overviewsRequest = null;
+    let overviewsUrl = null;
+    let overviewsTimer = null;
+    // The search whose results (or error) the page is showing
+    let overviewsShownFor = null;
+    let detailsRequest = null;
+
+    let searchSource = null;
+    let searchSession = null;
+    let searchSeq = 0;
+    let searchSeqUrl = null;
+    let searchUpdateRequest = null;
+    let searchUpdatePending = false;
+
+    let suggestRequests = {};
+
+
+    function displayOverviews(overviews) {
+        let overviewsTbody =
+            document.getElementById('overviewsTable').getElementsByTagName('tbody')[0];
+
+        overviewsTbody.innerHTML = '';
+        appendOverviews(overviews);
+    }
+
+    function appendOverviews(overviews) {
+        let overviewsTbody =
+            document.getElementById('overviewsTable').getElementsByTagName('tbody')[0];
+
+        for (let i = 0; i < overviews.length; i += 1) {
+        let overview = overviews[i];
+
+        let row = overviewsTbody.insertRow();
+        let classidCell = row.insertCell(0);
+        let deptCell = row.insertCell(1);
+        let coursenumCell = row.insertCell(2);
+        let areaCell = row.insertCell(3);
+        let titleCell = row.insertCell(4);
+
+        let classid = overview.classid;
+        let button = document.createElement('button');
+        button.id = 'button' + classid;
+        button.className = 'btn-classid';
+        button.textContent = classid;
+        button.setAttribute('onclick', 'getResultsDetails(' + classid + ')');
+
+        classidCell.appendChild(button);
+        deptCell.textContent = overview.dept;
+        coursenumCell.textContent = overview.coursenum;
+        areaCell.textContent = overview.area || '';
+        titleCell.textContent = overview.title || '';
+ }
+ }
+
+ function retryDelay(request) {
+    let seconds = parseInt(request.getResponseHeader('Retry-After'), 10);
+    if (isNaN(seconds) || seconds < 1) {
+        seconds = 1;
+    }
+    return seconds * 1000;
+ }
+
+ function displayTruncation(info) {
+    let notice = document.getElementById('truncatedNotice');
+    if (info && info.truncated) {
+        notice.textContent = 'Showing the first ' + info.limit +
+            ' of about ' + info.estimated +
+            ' classes. Please narrow your search to see the rest.';
+        notice.classList.remove('d-none');
+    }
+    else {
+        notice.textContent = '';
+        notice.classList.add('d-none');
+    }
+ }
+
+ function handleOverviewsResponse() {
+    if (this.status === 429 || this.status === 503) {
+    window.clearTimeout(overviewsTimer);
+    overviewsTimer = window.setTimeout(getOverviews, retryDelay(this));
+    overviewsRequest = null;
+    return;
+ }
+    overviewsShownFor = overviewsUrl;
+    if (this.status !== 200) {
+    alert('Error: Failed to fetch data from server');
+    overviewsRequest = null;
+    return;
+ }
+
+ try {
+    let response = JSON.parse(this.responseText);
+    if (response[0] === true) {
+        displayOverviews(response[1]);
+        displayTruncation(response[2]);
+    }
+    else {
+        alert('Error: ' + response[1]);
+    }
+ }
+ catch (e) {
+    alert('Error: Failed to parse response from server');
+ }
+
+ overviewsRequest = null;
+ }
+
+ function handleOverviewsError() {
+    if (this.statusText !== 'abort') {
+        alert('Error: Failed to fetch data from server');
+    }
+    overviewsRequest = null;
+ }
+
+ function overviewsQuery() {
+    let deptInput = document.getElementById('deptInput');
+    let coursenumInput = document.getElementById('coursenumInput');
+    let areaInput = document.getElementById('areaInput');
+    let titleInput = document.getElementById('titleInput');
+
+    let dept = deptInput.value.trim();
+    let coursenum = coursenumInput.value.trim();
+    let area = areaInput.value.trim();
+    let title = titleInput.value.trim();
+
+    let url = '';
+    let first = true;
+
+ function addParam(name, value) {
+    if (value === '') {
+        return;
+    }
+    if (first) {
+        url += '?';
+        first = false;
+    }
+    else {
+        url += '&';
+    }
+        url += name + '=' + encodeURIComponent(value);
+    }
+
+    addParam('dept', dept);
+    addParam('coursenum', coursenum);
+    addParam('area', area);
+    addParam('title', title);
+
+    return url;
+ }
+
+ function getOverviews() {
+    overviewsUrl = '/regoverviews' + overviewsQuery();
+
+    if (overviewsRequest !== null) {
+        overviewsRequest.abort();
+    }
+
+    overviewsRequest = new XMLHttpRequest();
+    overviewsRequest.onload = handleOverviewsResponse;
+    overviewsRequest.onerror = handleOverviewsError;
+    overviewsRequest.open('GET', overviewsUrl);
+    overviewsRequest.send();
+ }
+
+ function debouncedGetOverviews() {
+    window.clearTimeout(overviewsTimer);
+    overviewsTimer = window.setTimeout(getOverviews, 500);
+ }
+
+ function handleSearchUpdateResponse() {
+    searchUpdateRequest = null;
+    if (this.status === 429) {
+        window.setTimeout(sendSearchUpdate, retryDelay(this));
+        return;
+    }
+    if (this.status === 404) {
+        // The server has forgotten the session; open a new one.
+        searchSource.close();
+        searchSession = null;
+        setupSearchStream();
+        return;
+    }
+    if (searchUpdatePending) {
+        postSearchUpdate();
+    }
+ }
+
+ function postSearchUpdate() {
+    let query = overviewsQuery();
+
+    searchUpdatePending = false;
+    searchSeq += 1;
+    searchSeqUrl = '/regoverviews' + query;
+
+    let body = 'seq=' + searchSeq;
+    if (query !== '') {
+        body += '&' + query.substring(1);
+    }
+
+    searchUpdateRequest = new XMLHttpRequest();
+    searchUpdateRequest.onload = handleSearchUpdateResponse;
+    searchUpdateRequest.onerror = handleSearchUpdateResponse;
+    searchUpdateRequest.open('POST',
+        '/regoverviews/stream/' + searchSession);
+    searchUpdateRequest.setRequestHeader('Content-Type',
+        'application/x-www-form-urlencoded');
+    searchUpdateRequest.send(body);
+ }
+
+ function sendSearchUpdate() {
+    if (searchSession === null) {
+        debouncedGetOverviews();
+        return;
+    }
+    // At most one update is in flight; later input is coalesced
+    // into a single update sent when it completes.
+    searchUpdatePending = true;
+    if (searchUpdateRequest === null) {
+        postSearchUpdate();
+    }
+ }
+
+ function isCurrentSearch(event) {
+    let data = JSON.parse(event.data);
+    if (String(data.seq) !== String(searchSeq)) {
+        return null;
+    }
+    return data;
+ }
+
+ function handleSearchRows(event) {
+    let data = isCurrentSearch(event);
+    if (data === null) {
+        return;
+    }
+    if (data.first) {
+        displayOverviews(data.rows);
+    }
+    else {
+        appendOverviews(data.rows);
+    }
+ }
+
+ function handleSearchDone(event) {
+    let data = isCurrentSearch(event);
+    if (data === null) {
+        return;
+    }
+    displayTruncation(data.info[0]);
+    overviewsShownFor = searchSeqUrl;
+ }
+
+ function handleSearchBusy(event) {
+    let data = isCurrentSearch(event);
+    if (data !== null) {
+        window.setTimeout(sendSearchUpdate, data.retry);
+    }
+ }
+
+ function handleSearchError(event) {
+    let data = isCurrentSearch(event);
+    if (data !== null) {
+        overviewsShownFor = searchSeqUrl;
+        alert('Error: ' + data.message);
+    }
+ }
+
+ function handleSearchSession(event) {
+    searchSession = JSON.parse(event.data).session;
+    sendSearchUpdate();
+ }
+
+ function handleSearchStreamError() {
+    // Until the browser reconnects and the server opens a new
+    // session, searches use plain requests.
+    searchSession = null;
+    if (searchSource.readyState === EventSource.CLOSED) {
+        // The browser gave up on the stream.
+        searchSource = null;
+        getOverviews();
+    }
+ }
+
+ function setupSearchStream() {
+    if (!window.EventSource) {
+        return false;
+    }
+    searchSource = new EventSource('/regoverviews/stream');
+    searchSource.addEventListener('session', handleSearchSession);
+    searchSource.addEventListener('rows', handleSearchRows);
+    searchSource.addEventListener('done', handleSearchDone);
+    searchSource.addEventListener('busy', handleSearchBusy);
+    searchSource.addEventListener('failure', handleSearchError);
+    searchSource.onerror = handleSearchStreamError;
+    return true;
+ }
+
+
+ function addDetailsRow(tbody, label, value) {
+    let row = tbody.insertRow();
+    let labelCell = row.insertCell(0);
+    let valueCell = row.insertCell(1);
+    labelCell.innerHTML = '<strong>' + label + '</strong>';
+    valueCell.textContent = value || '';
+ }
+
+ function displayDetails(details) {
+    let classDetailsTbody =
+    document.getElementById('classDetailsTable').getElementsByTagName('tbody')[0];
+    let courseDetailsTbody =
+    document.getElementById('courseDetailsTable').getElementsByTagName('tbody')[0];
+
+    classDetailsTbody.innerHTML = '';
+    courseDetailsTbody.innerHTML = '';
+
+    addDetailsRow(classDetailsTbody, 'Class Id', details.classid);
+    addDetailsRow(classDetailsTbody, 'Days', details.days || '');
+    addDetailsRow(classDetailsTbody, 'Start time', details.starttime || '');
+    addDetailsRow(classDetailsTbody, 'End time', details.endtime || '');
+    addDetailsRow(classDetailsTbody, 'Building', details.bldg || '');
+    addDetailsRow(classDetailsTbody, 'Room', details.roomnum || '');
+
+    addDetailsRow(courseDetailsTbody, 'Course Id', details.courseid);
+
+    if (details.deptcoursenums && details.deptcoursenums.length > 0) {
+        for (let i = 0; i < details.deptcoursenums.length; i += 1) {
+            let item = details.deptcoursenums[i];
+            addDetailsRow(courseDetailsTbody, 'Dept and Number', item.dept
+            + ' ' + item.coursenum);
+        }
+    }
+
+    addDetailsRow(courseDetailsTbody, 'Area', details.area || '');
+    addDetailsRow(courseDetailsTbody, 'Title', details.title || '');
+    addDetailsRow(courseDetailsTbody, 'Description', details.descrip || '');
+    addDetailsRow(courseDetailsTbody, 'Prerequisites', details.prereqs || '');
+
+    let profText = '';
+    if (details.profnames && details.profnames.length > 0) {
+        profText = details.profnames.join('\n');
+    }
+
+    let profRow = courseDetailsTbody.insertRow();
+    let profLabelCell = profRow.insertCell(0);
+    let profValueCell = profRow.insertCell(1);
+    profLabelCell.innerHTML = '<strong>Professor</strong>';
+    profValueCell.innerHTML = profText.replace(/\n/g, '<br>');
+ }
+
+ function handleDetailsResponse() {
+    if (this.status !== 200) {
+        alert('Error: Failed to fetch data from server');
+        detailsRequest = null;
+    return;
+ }
+
+ try {
+    let response = JSON.parse(this.responseText);
+ if (response[0] === true) {
+    displayDetails(response[1]);
+    let modalNode = document.getElementById('classDetailsModal');
+    let modal = new bootstrap.Modal(modalNode);
+    modal.show();
+ }
+ else {
+    alert('Error: ' + response[1]);
+ }
+ }
+ catch (e) {
+    alert('Error: Failed to parse response from server');
+ }
+
+ detailsRequest = null;
+ }
+
+ function handleDetailsError() {
+    if (this.statusText !== 'abort') {
+        alert('Error: Failed to fetch data from server');
+    }
+    detailsRequest = null;
+ }
+
+ function getResultsDetails(classid) {
+    let encodedClassid = encodeURIComponent(classid);
+    let url = '/regdetails?classid=' + encodedClassid;
+
+    if (detailsRequest !== null) {
+        detailsRequest.abort();
+    }
+
+    detailsRequest = new XMLHttpRequest();
+    detailsRequest.onload = handleDetailsResponse;
+    detailsRequest.onerror = handleDetailsError;
+    detailsRequest.open('GET', url);
+    detailsRequest.send();
+ }
+
+ function handleSuggestResponse(datalist) {
+    if (this.status !== 200) {
+        return;
+    }
+    let response = JSON.parse(this.responseText);
+    if (response[0] !== true) {
+        return;
+    }
+    datalist.innerHTML = '';
+    for (let i = 0; i < response[1].length; i += 1) {
+        let option = document.createElement('option');
+        option.value = response[1][i].value;
+        datalist.appendChild(option);
+    }
+ }
+
+ function getSuggestions(field) {
+    let input = document.getElementById(field + 'Input');
+    let datalist = document.getElementById(field + 'Suggestions');
+
+    if (suggestRequests[field]) {
+        suggestRequests[field].abort();
+    }
+
+    let suggestRequest = new XMLHttpRequest();
+    suggestRequest.onload = function () {
+        suggestRequests[field] = null;
+        handleSuggestResponse.call(this, datalist);
+    };
+    suggestRequest.open('GET', '/suggest?field=' + field + '&prefix=' +
+        encodeURIComponent(input.value.trim()));
+    suggestRequest.send();
+    suggestRequests[field] = suggestRequest;
+ }
+
+ function setupSearchInputs() {
+    let deptInput = document.getElementById('deptInput');
+    let coursenumInput = document.getElementById('coursenumInput');
+    let areaInput = document.getElementById('areaInput');
+    let titleInput = document.getElementById('titleInput');
+
+    deptInput.addEventListener('input', sendSearchUpdate);
+    coursenumInput.addEventListener('input', sendSearchUpdate);
+    areaInput.addEventListener('input', sendSearchUpdate);
+    titleInput.addEventListener('input', sendSearchUpdate);
+
+    deptInput.addEventListener('input', function () {
+        getSuggestions('dept');
+    });
+    areaInput.addEventListener('input', function () {
+        getSuggestions('area');
+    });
+    getSuggestions('dept');
+    getSuggestions('area');
+ }
+
+ function setup() {
+    setupSearchInputs();
+    if (!setupSearchStream()) {
+        getOverviews();
+    }
+ }
+
+ document.addEventListener('DOMContentLoaded', setup);
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+#-----------------------------------------------------------------------
+# benchmemory.py
+# Authors: Nicole Deng and Ziya Momin
+#-----------------------------------------------------------------------
+
+"""
+Memory benchmark for class overview results. Compares the old row
+representation (a dict per row, serialized with json.dumps) with the
+compact one (interned OverviewRow tuples encoded directly) for a
+full-catalog query and for a warm cache holding many results. Each
+measurement runs in a fresh process so its peak RSS is its own.
+"""
+
+import sys
+import json
+import argparse
+import resource
+import sqlite3
+import subprocess
+import tracemalloc
+import runserver
+from overviews import overview_row, encode_overviews
+
+MODES = ('dicts', 'rows')
+SCENARIOS = ('full', 'cache')
+
+def get_args():
+    """
+    Parses command-line arguments for the memory benchmark.
+    """
+    parser = argparse.ArgumentParser(
+        description='Measure the memory used by class overview results')
+
+    parser.add_argument(
+        '--database', default='reg.sqlite',
+        help='the database to query (default: reg.sqlite)')
+
+    parser.add_argument(
+        '--copies', type=int, default=10,
+        help='how many times the cache scenario caches each result '
+            + '(default: 10)')
+
+    parser.add_argument(
+        '--run', nargs=3, metavar=('SCENARIO', 'MODE', 'MEASURE'),
+        help=argparse.SUPPRESS)
+
+    return parser.parse_args()
+
+def current_rss_kb():
+    """
+    Returns the resident set size of this process in kilobytes.
+    """
+    with open('/proc/self/status', encoding='ascii') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+def fetch(conn, mode, raw):
+    """
+    Runs the overview query for the raw filters and returns the rows
+    and the encoded response body in the representation of mode.
+    """
+    params = runserver.overview_params(raw, None, None, -1)
+    if mode == 'dicts':
+        conn.row_factory = sqlite3.Row
+        rows = [dict(row) for row in
+                conn.execute(runserver.OVERVIEWS_QUERY, params)]
+        body = (json.dumps([True, rows], separators=(',', ':'),
+                           sort_keys=True) + '\n').encode('ascii')
+    else:
+        conn.row_factory = overview_row
+        rows = conn.execute(runserver.OVERVIEWS_QUERY, params).fetchall()
+        body = encode_overviews([True, rows])
+    return (rows, body)
+
+def searches(conn):
+    """
+    Returns the raw filters of the searches cached by the cache
+    scenario: one per dept, one per area and one per title word.
+    """
+    depts = [row[0] for row in
+             conn.execute('SELECT DISTINCT dept FROM crosslistings')]
+    areas = [row[0] for row in
+             conn.execute('SELECT DISTINCT area FROM courses')]
+    words = sorted({word.lower() for row in
+                    conn.execute('SELECT title FROM courses')
+                    for word in row[0].split() if len(word) > 4})[:200]
+    return ([[dept, '', '', ''] for dept in depts]
+            + [['', '', area, ''] for area in areas if area]
+            + [['', '', '', word] for word in words])
+
+def run(database, scenario, mode, measure, copies):
+    """
+    Runs one scenario in one mode and prints its measurements as JSON.
+    """
+    conn = sqlite3.connect(database)
+    raws = searches(conn) if scenario == 'cache' else []
+    if measure == 'traced':
+        tracemalloc.start()
+    before = current_rss_kb()
+
+    cache = []
+    if scenario == 'full':
+        cache.append(fetch(conn, mode, ['', '', '', '']))
+    else:
+        for _ in range(copies):
+            for raw in raws:
+                cache.append(fetch(conn, mode, raw))
+
+    result = {'rows': sum(len(rows) for rows, _ in cache),
+              'results': len(cache)}
+    if measure == 'traced':
+        result['traced_peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result['rss_growth_kb'] = peak - before
+    conn.close()
+    print(json.dumps(result))
+
+def measure(database, scenario, mode, kind, copies):
+    """
+    Runs one measurement in a child process and returns its results.
+    """
+    output = subprocess.run(
+        [sys.executable, __file__, '--database', database,
+         '--copies', str(copies), '--run', scenario, mode, kind],
+        capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+def main():
+    """
+    Measures every scenario in every mode and prints a comparison.
+    """
+    args = get_args()
+    if args.run is not None:
+        run(args.database, *args.run, args.copies)
+        return
+
+    print(f'{"scenario":8} {"mode":6} {"results":>8} {"rows":>9} '
+          f'{"peak RSS growth":>16} {"traced peak":>12}')
+    for scenario in SCENARIOS:
+        found = {}
+        for mode in MODES:
+            rss = measure(args.database, scenario, mode, 'rss',
+                          args.copies)
+            traced = measure(args.database, scenario, mode, 'traced',
+                             args.copies)
+            found[mode] = (rss['rss_growth_kb'], traced['traced_peak_kb'])
+            print(f'{scenario:8} {mode:6} {rss["results"]:8} '
+                  f'{rss["rows"]:9} {rss["rss_growth_kb"]:13} KB '
+                  f'{traced["traced_peak_kb"]:9} KB')
+        old, new = found['dicts'], found['rows']
+        print(f'{scenario:8} saving {"":8} {"":9} '
+              f'{100 * (1 - new[0] / max(old[0], 1)):14.0f} % '
+              f'{100 * (1 - new[1] / max(old[1], 1)):10.0f} %')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+#-----------------------------------------------------------------------
+# benchscale.py
+# Authors: Nicole Deng and Ziya Momin
+#-----------------------------------------------------------------------
+
+"""
+Scaling benchmark for the registrar application. Generates synthetic
+catalogs at several multiples of reg.sqlite's size (see
+gencatalog.py), serves each one, and measures the latency of
+/regoverviews and /regdetails queries and the server's peak memory,
+to show how they grow with the size of the catalog.
+"""
+
+import os
+import sys
+import csv
+import time
+import sqlite3
+import argparse
+import statistics
+import urllib.request
+import gencatalog
+import testregparallel
+
+OVERVIEW_QUERIES = [
+    '/regoverviews',
+    '/regoverviews?dept=COS',
+    '/regoverviews?coursenum=3',
+    '/regoverviews?area=QR&title=intro',
+    '/regoverviews?title=the',
+]
+
+def get_args():
+    """
+    Parses command-line arguments for the scaling benchmark.
+    """
+    parser = argparse.ArgumentParser(
+        description='Measure how the reg application scales with the '
+            + 'size of its catalog')
+
+    parser.add_argument(
+        '--scales', type=float, nargs='+', default=[1, 10, 100],
+        help='the catalog sizes, as multiples of the source database '
+            + '(default: 1 10 100)')
+
+    parser.add_argument(
+        '--source', default='reg.sqlite',
+        help='the database to scale (default: reg.sqlite)')
+
+    parser.add_argument(
+        '--workdir', default='scaled',
+        help='the directory for the generated databases, which are '
+            + 'reused by later runs (default: scaled)')
+
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='how many times to time each query; the median counts '
+            + '(default: 5)')
+
+    parser.add_argument(
+        '--csv', metavar='FILE',
+        help='also write the measurements to FILE for charting')
+
+    return parser.parse_args()
+
+def scaled_database(source, workdir, scale):
+    """
+    Returns the path of the synthetic catalog scale times the size of
+    source, generating it first if it does not exist. Scale 1 is the
+    source itself.
+    """
+    if scale == 1:
+        return source
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, f'reg-x{scale:g}.sqlite')
+    if not os.path.exists(path):
+        print(f'Generating {path}', file=sys.stderr)
+        gencatalog.create_catalog(source, path, scale)
+    return path
+
+# The classes of the /regdetails queries, in the order
+# details_queries returns them.
+DETAILS_CLASSES = ('first', 'middle', 'last', 'missing')
+
+def details_queries(database):
+    """
+    Returns /regdetails queries for the first, middle and last classes
+    of database and for a class that does not exist, as (key, query)
+    pairs. The key names the class, since the classids differ between
+    scales.
+    """
+    conn = sqlite3.connect(database)
+    try:
+        classids = [row[0] for row in conn.execute(
+            'SELECT classid FROM classes ORDER BY classid')]
+    finally:
+        conn.close()
+    picks = [classids[0], classids[len(classids) // 2], classids[-1],
+             classids[-1] + 1]
+    return [(f'/regdetails ({name})', f'/regdetails?classid={classid}')
+            for name, classid in zip(DETAILS_CLASSES, picks)]
+
+def time_request(url):
+    """
+    Returns how many seconds it takes to fetch url completely.
+    """
+    start = time.perf_counter()
+    with urllib.request.urlopen(url) as flo:
+        flo.read()
+    return time.perf_counter() - start
+
+def peak_rss_kb(pid):
+    """
+    Returns the peak resident set size of process pid in kilobytes.
+    """
+    with open(f'/proc/{pid}/status', encoding='ascii') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return 0
+
+def measure_scale(database, repeat):
+    """
+    Serves database and returns the measurements of every query, as
+    (key, query, first seconds, median seconds) tuples, and the
+    server's peak RSS in kilobytes.
+    """
+    processes = []
+    results = []
+    with testregparallel.running_server(
+            database, *testregparallel.SERVER_OPTIONS,
+            processes=processes) as server_url:
+        queries = ([(query, query) for query in OVERVIEW_QUERIES]
+                   + details_queries(database))
+        for key, query in queries:
+            first = time_request(server_url + query)
+            times = [time_request(server_url + query)
+                     for _ in range(repeat)]
+            results.append((key, query, first, statistics.median(times)))
+        peak = peak_rss_kb(processes[0].pid)
+    return (results, peak)
+
+def main():
+    """
+    Measures every scale and prints the latencies and peak memory,
+    with each scale's growth relative to the first.
+    """
+    args = get_args()
+    rows = []
+    baseline = {}
+    for scale in args.scales:
+        database = scaled_database(args.source, args.workdir, scale)
+        conn = sqlite3.connect(database)
+        classes = conn.execute('SELECT COUNT(*) FROM classes').fetchone()[0]
+        conn.close()
+        results, peak = measure_scale(database, args.repeat)
+
+        print(f'scale {scale:g}: {classes} classes, '
+              f'{os.path.getsize(database) // 1024} KB database, '
+              f'server peak RSS {peak // 1024} MB')
+        print(f'  {"query":45} {"first ms":>9} {"median ms":>10} '
+              f'{"growth":>7}')
+        for key, query, first, median in results:
+            baseline.setdefault(key, median)
+            growth = median / max(baseline[key], 1e-9)
+            print(f'  {query:45} {first * 1000:9.1f} '
+                  f'{median * 1000:10.1f} {growth:6.1f}x')
+            rows.append([f'{scale:g}', classes, key, query,
+                         round(first * 1000, 3), round(median * 1000, 3),
+                         peak])
+        print()
+
+    if args.csv is not None:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['scale', 'classes', 'key', 'query',
+                             'first_ms', 'median_ms', 'peak_rss_kb'])
+            writer.writerows(rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""
+Helpers for in-memory indexes derived from a registrar database. An
+index is built once per version of the database file and rebuilt
+automatically when the file changes.
+"""
+
+import os
+import sqlite3
+import threading
+
+
+def database_version(path):
+    """
+    Returns a string identifying the current contents of the database
+    file at path. It changes whenever the file is modified or replaced.
+    """
+    st = os.stat(path)
+    return f"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+class VersionedIndex:
+    """
+    Lazily builds an index from a database by calling
+    builder(connection) and caches the result per database path until
+    the database version changes.
+    """
+
+    def __init__(self, builder):
+        self._builder = builder
+        self._built = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """
+        Returns the index for the database at path, building it first
+        if it does not exist or the database has changed.
+        """
+        version = database_version(path)
+        cached = self._built.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            cached = self._built.get(path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            conn = sqlite3.connect(path)
+            try:
+                index = self._builder(conn)
+            finally:
+                conn.close()
+            self._built[path] = (version, index)
+            return index
+
+    def discard(self, path):
+        """
+        Drops the index for the database at path, if one is cached.
+        """
+        with self._lock:
+            self._built.pop(path, None)
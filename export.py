@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+"""
+Bulk export of the whole catalog: every class with the details that
+/regdetails returns for it. The records are read with three set-based
+queries ordered by courseid and merged in a single pass, so the export
+needs neither a query per class nor the whole catalog in memory (except
+for the columnar format, which is built column by column).
+"""
+
+import io
+import csv
+import json
+import zlib
+
+# The fields of an exported class, in order.
+EXPORT_FIELDS = ("classid", "days", "starttime", "endtime", "bldg",
+                 "roomnum", "courseid", "area", "title", "descrip",
+                 "prereqs", "deptcoursenums", "profnames")
+
+# Separates the crosslistings and the professors within a CSV field.
+CSV_LIST_SEPARATOR = "; "
+
+# Encoded output is sent in chunks of about this many bytes.
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+CLASSES_QUERY = """
+    SELECT cl.classid, cl.days, cl.starttime, cl.endtime, cl.bldg,
+           cl.roomnum, cl.courseid, c.area, c.title, c.descrip, c.prereqs
+    FROM classes cl
+    LEFT JOIN courses c ON cl.courseid = c.courseid
+    ORDER BY cl.courseid, cl.classid
+"""
+
+CROSSLISTINGS_QUERY = """
+    SELECT courseid, dept, coursenum
+    FROM crosslistings
+    ORDER BY courseid, dept, coursenum
+"""
+
+PROFS_QUERY = """
+    SELECT cp.courseid, p.profname
+    FROM coursesprofs cp
+    JOIN profs p ON p.profid = cp.profid
+    ORDER BY cp.courseid, p.profname
+"""
+
+
+def _grouped(cursor):
+    """
+    Yields (courseid, rows) for the rows of cursor, whose first column
+    is a courseid they are ordered by, with the courseid removed.
+    """
+    courseid, group = None, []
+    for row in cursor:
+        if row[0] != courseid:
+            if group:
+                yield courseid, group
+            courseid, group = row[0], []
+        group.append(row[1:])
+    if group:
+        yield courseid, group
+
+
+def _matching(groups, courseid, pending):
+    """
+    Advances the (courseid, rows) iterator groups to courseid and
+    returns its rows there, or [] if it has none. pending is a one
+    element list holding the group read ahead of the last call.
+    """
+    while pending[0] is not None and pending[0][0] < courseid:
+        pending[0] = next(groups, None)
+    if pending[0] is not None and pending[0][0] == courseid:
+        return pending[0][1]
+    return []
+
+
+def export_records(conn):
+    """
+    Yields every class in the database connection conn as a dict with
+    the EXPORT_FIELDS, ordered by courseid and classid. All queries
+    read the same snapshot of the database.
+    """
+    conn.isolation_level = None
+    conn.execute("BEGIN")
+    try:
+        crosslistings = _grouped(conn.execute(CROSSLISTINGS_QUERY))
+        profs = _grouped(conn.execute(PROFS_QUERY))
+        pending_crosslistings = [next(crosslistings, None)]
+        pending_profs = [next(profs, None)]
+        for row in conn.execute(CLASSES_QUERY):
+            record = dict(zip(EXPORT_FIELDS, row))
+            courseid = record["courseid"]
+            record["deptcoursenums"] = [
+                {"dept": dept, "coursenum": coursenum}
+                for dept, coursenum in _matching(
+                    crosslistings, courseid, pending_crosslistings)]
+            record["profnames"] = [
+                profname for profname, in _matching(
+                    profs, courseid, pending_profs)]
+            yield record
+    finally:
+        conn.execute("COMMIT")
+
+
+def _chunked(pieces):
+    """
+    Joins the strings pieces into UTF-8 chunks of about
+    EXPORT_CHUNK_BYTES bytes.
+    """
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def ndjson_chunks(records):
+    """
+    Encodes records as newline-delimited JSON, one class per line.
+    """
+    return _chunked(json.dumps(record, separators=(",", ":")) + "\n"
+                    for record in records)
+
+
+def _csv_lines(records):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_FIELDS)
+    for record in records:
+        record["deptcoursenums"] = CSV_LIST_SEPARATOR.join(
+            f"{item['dept']} {item['coursenum']}"
+            for item in record["deptcoursenums"])
+        record["profnames"] = CSV_LIST_SEPARATOR.join(record["profnames"])
+        writer.writerow(record[field] for field in EXPORT_FIELDS)
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    yield out.getvalue()
+
+
+def csv_chunks(records):
+    """
+    Encodes records as CSV with a header row. Crosslistings ("COS
+    333") and professor names are joined with CSV_LIST_SEPARATOR.
+    """
+    return _chunked(_csv_lines(records))
+
+
+def columnar_chunks(records):
+    """
+    Encodes records as one JSON object holding the number of rows and,
+    for each field, the array of its values in row order.
+    """
+    columns = {field: [] for field in EXPORT_FIELDS}
+    for record in records:
+        for field in EXPORT_FIELDS:
+            columns[field].append(record[field])
+    pieces = [f'{{"rows":{len(columns["classid"])},"columns":{{']
+    for i, field in enumerate(EXPORT_FIELDS):
+        pieces.append(("," if i else "") + json.dumps(field) + ":"
+                      + json.dumps(columns.pop(field),
+                                   separators=(",", ":")))
+    pieces.append("}}\n")
+    return _chunked(pieces)
+
+
+# Each export format's MIME type, file extension and encoder.
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson", ndjson_chunks),
+    "csv": ("text/csv", "csv", csv_chunks),
+    "columnar": ("application/json", "json", columnar_chunks),
+}
+
+
+def gzip_chunks(chunks):
+    """
+    Compresses the byte strings chunks into one gzip stream.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
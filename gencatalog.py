@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+
+"""
+Generates synthetic registrar databases for scaling tests. The output
+has the schema of a source database (reg.sqlite by default) and is
+filled with scale times as many courses, classes, crosslistings and
+professors, drawn from the source's own value distributions: how many
+classes, crosslistings and professors a course has, which meeting
+times and rooms go together, which departments, course numbers and
+areas occur how often, and the words and lengths of titles and
+descriptions.
+"""
+
+import os
+import sys
+import random
+import sqlite3
+import argparse
+from collections import Counter
+
+BATCH_ROWS = 10000
+
+
+class Distributions:
+    """
+    The value distributions of a source database, as lists to sample
+    from uniformly (repeated values make frequent values likelier).
+    """
+
+    def __init__(self, conn):
+        def column(query):
+            return [row[0] for row in conn.execute(query)]
+
+        def per_course(table):
+            counts = Counter(column(f"SELECT courseid FROM {table}"))
+            courses = column("SELECT courseid FROM courses")
+            return [counts.get(courseid, 0) for courseid in courses]
+
+        self.classes_per_course = per_course("classes")
+        self.crosslistings_per_course = per_course("crosslistings")
+        self.profs_per_course = per_course("coursesprofs")
+        self.meetings = conn.execute(
+            "SELECT days, starttime, endtime, bldg, roomnum "
+            "FROM classes").fetchall()
+        self.depts = column("SELECT dept FROM crosslistings")
+        self.coursenums = column("SELECT coursenum FROM crosslistings")
+        self.areas = column("SELECT area FROM courses")
+        self.prereqs = column("SELECT prereqs FROM courses")
+
+        titles = [title.split() for title in
+                  column("SELECT title FROM courses")]
+        self.title_lengths = [len(words) for words in titles if words]
+        self.title_words = [word for words in titles for word in words]
+        descrips = [descrip.split() for descrip in
+                    column("SELECT descrip FROM courses")]
+        self.descrip_lengths = [len(words) for words in descrips]
+        self.descrip_words = [word for words in descrips for word in words]
+
+        names = [name.split() for name in
+                 column("SELECT profname FROM profs")]
+        self.first_names = [words[0] for words in names if words]
+        self.last_names = [words[-1] for words in names if len(words) > 1]
+        self.prof_count = len(names)
+
+
+def _text(rng, words, length):
+    return " ".join(rng.choice(words) for _ in range(length))
+
+
+def generate(dist, scale, descrip_factor, rng):
+    """
+    Yields (table, row) pairs for a synthetic catalog scale times the
+    size of the source of the distributions dist.
+    """
+    prof_count = max(1, round(dist.prof_count * scale))
+    for profid in range(prof_count):
+        yield "profs", (profid, f"{rng.choice(dist.first_names)} "
+                                f"{rng.choice(dist.last_names)}")
+
+    classid = 1
+    course_count = round(len(dist.classes_per_course) * scale)
+    for courseid in range(1, course_count + 1):
+        descrip_length = round(rng.choice(dist.descrip_lengths)
+                               * descrip_factor)
+        yield "courses", (
+            courseid, rng.choice(dist.areas),
+            _text(rng, dist.title_words, rng.choice(dist.title_lengths)),
+            _text(rng, dist.descrip_words, descrip_length),
+            rng.choice(dist.prereqs))
+        for _ in range(rng.choice(dist.classes_per_course)):
+            yield "classes", (classid, courseid,
+                              *rng.choice(dist.meetings))
+            classid += 1
+        listings = set()
+        for _ in range(max(1, rng.choice(dist.crosslistings_per_course))):
+            listings.add((rng.choice(dist.depts),
+                          rng.choice(dist.coursenums)))
+        for dept, coursenum in sorted(listings):
+            yield "crosslistings", (courseid, dept, coursenum)
+        for profid in sorted({rng.randrange(prof_count) for _ in
+                              range(rng.choice(dist.profs_per_course))}):
+            yield "coursesprofs", (courseid, profid)
+
+
+def create_catalog(source, output, scale, descrip_factor=1.0, seed=0):
+    """
+    Writes a synthetic catalog scale times the size of the database at
+    path source, with descriptions descrip_factor times as long, to a
+    new database at path output. Returns the row count of each table.
+    """
+    if os.path.exists(output):
+        raise FileExistsError(f"{output} already exists")
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"{source} does not exist")
+    rng = random.Random(seed)
+    src = sqlite3.connect(source)
+    try:
+        dist = Distributions(src)
+        schema = src.execute(
+            "SELECT type, sql FROM sqlite_master "
+            "WHERE sql IS NOT NULL ORDER BY type DESC").fetchall()
+        columns = {table: len(src.execute(
+            f"SELECT * FROM {table} LIMIT 0").description)
+            for table in ("courses", "classes", "crosslistings", "profs",
+                          "coursesprofs")}
+    finally:
+        src.close()
+
+    conn = sqlite3.connect(output)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        for kind, sql in schema:
+            if kind == "table":
+                conn.execute(sql)
+
+        counts = Counter()
+        pending = {table: [] for table in columns}
+
+        def flush(table):
+            placeholders = ", ".join("?" * columns[table])
+            conn.executemany(
+                f"INSERT INTO {table} VALUES ({placeholders})",
+                pending[table])
+            pending[table] = []
+
+        for table, row in generate(dist, scale, descrip_factor, rng):
+            pending[table].append(row)
+            counts[table] += 1
+            if len(pending[table]) >= BATCH_ROWS:
+                flush(table)
+        for table in columns:
+            flush(table)
+
+        # Indexes are cheaper to build once the rows are in.
+        for kind, sql in schema:
+            if kind == "index":
+                conn.execute(sql)
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return dict(counts)
+
+
+def main():
+    """
+    Writes a synthetic catalog database and reports its size.
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic registrar database with the "
+        "schema and value distributions of a real one")
+    parser.add_argument(
+        "output", help="the database file to create")
+    parser.add_argument(
+        "--scale", type=float, default=10,
+        help="how many times larger than the source to make it "
+        "(default: %(default)s)")
+    parser.add_argument(
+        "--source", default="reg.sqlite",
+        help="the database to take the schema and distributions from "
+        "(default: %(default)s)")
+    parser.add_argument(
+        "--descrip-factor", type=float, default=1.0,
+        help="how many times longer than the source's to make course "
+        "descriptions (default: %(default)s)")
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="the random seed (default: %(default)s)")
+    args = parser.parse_args()
+    if args.scale <= 0:
+        parser.error("scale must be positive")
+
+    try:
+        counts = create_catalog(args.source, args.output, args.scale,
+                                args.descrip_factor, args.seed)
+    except (OSError, sqlite3.Error) as e:
+        print(f"{sys.argv[0]}: {e}", file=sys.stderr)
+        sys.exit(1)
+    for table, count in sorted(counts.items()):
+        print(f"{table}: {count} rows", file=sys.stderr)
+    print(f"{args.output}: {os.path.getsize(args.output)} bytes",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""
+Compact class overview rows. Overview rows are kept as named tuples
+rather than dicts, with their short, highly repeated strings (dept,
+coursenum and area) interned so that every row shares one copy, and
+are encoded to JSON directly rather than through per-row dicts.
+"""
+
+import sys
+import json
+from collections import namedtuple
+from json.encoder import encode_basestring_ascii
+
+# The fields of an overview row, in the order OVERVIEWS_QUERY selects
+# them.
+OverviewRow = namedtuple("OverviewRow",
+                         ("classid", "dept", "coursenum", "title", "area"))
+
+# An encoded overview row; the keys are sorted, as in jsonify output.
+ROW_JSON = ('{{"area":{area},"classid":{classid},"coursenum":{coursenum},'
+            '"dept":{dept},"title":{title}}}')
+
+
+def _intern(value):
+    return None if value is None else sys.intern(value)
+
+
+def overview_row(cursor, values):
+    """
+    A sqlite3 row factory for OVERVIEWS_QUERY that returns OverviewRows
+    with interned dept, coursenum and area strings.
+    """
+    classid, dept, coursenum, title, area = values
+    return OverviewRow(classid, _intern(dept), _intern(coursenum), title,
+                       _intern(area))
+
+
+def overview_dicts(rows):
+    """
+    Returns rows as dicts, for serializers that need them.
+    """
+    return [row._asdict() for row in rows]
+
+
+def _encode_string(value, encoded):
+    if value is None:
+        return "null"
+    text = encoded.get(value)
+    if text is None:
+        text = encoded[value] = encode_basestring_ascii(value)
+    return text
+
+
+def encode_overviews(result):
+    """
+    Returns the JSON encoding of the /regoverviews document result,
+    [True, rows] or [True, rows, info] with rows a list of
+    OverviewRows, as UTF-8 bytes identical to what jsonify produces
+    for it with the rows as dicts.
+    """
+    encoded = {}
+    pieces = ["[true,["]
+    for i, row in enumerate(result[1]):
+        if i:
+            pieces.append(",")
+        pieces.append(ROW_JSON.format(
+            area=_encode_string(row.area, encoded),
+            classid=int(row.classid),
+            coursenum=_encode_string(row.coursenum, encoded),
+            dept=_encode_string(row.dept, encoded),
+            title=encode_basestring_ascii(row.title)
+            if row.title is not None else "null"))
+    pieces.append("]")
+    for info in result[2:]:
+        pieces.append(",")
+        pieces.append(json.dumps(info, separators=(",", ":"),
+                                 sort_keys=True))
+    pieces.append("]\n")
+    return "".join(pieces).encode("ascii")
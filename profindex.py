@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+"""
+An in-memory index of professor names for professor searches. Names
+are normalized once (accents, case and punctuation removed) and each
+professor's set of courseids is precomputed, so that a search is a
+substring scan over one string plus set unions, with no table joins.
+"""
+
+import re
+import bisect
+import unicodedata
+
+# Separates names in the searchable string; it never occurs in a
+# normalized name or query.
+SEPARATOR = "\n"
+
+
+def normalize_name(name):
+    """
+    Returns name without accents, punctuation, case or repeated
+    spaces, e.g. "Brian W. Kernighan" -> "brian w kernighan".
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(ch for ch in decomposed
+                       if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[\W_]+", " ", stripped.casefold()).split())
+
+
+class ProfIndex:
+    """
+    The professors of a registrar database with their courseids,
+    searchable by normalized name substring.
+    """
+
+    def __init__(self, profs, courses_profs, rows_per_course):
+        courseids = {}
+        for courseid, profid in courses_profs:
+            courseids.setdefault(profid, set()).add(courseid)
+
+        self._profs = sorted(
+            (normalize_name(profname), profname, profid,
+             frozenset(courseids.get(profid, ())))
+            for profid, profname in profs)
+        self._starts = []
+        offset = 0
+        for normalized, _, _, _ in self._profs:
+            self._starts.append(offset)
+            offset += len(normalized) + len(SEPARATOR)
+        self._haystack = SEPARATOR.join(
+            normalized for normalized, _, _, _ in self._profs)
+        self._rows_per_course = rows_per_course
+
+    def _matches(self, query):
+        """
+        Yields the index entries whose normalized name contains the
+        normalized query.
+        """
+        needle = normalize_name(query)
+        if needle == "":
+            yield from self._profs
+            return
+        last = -1
+        position = self._haystack.find(needle)
+        while position >= 0:
+            i = bisect.bisect_right(self._starts, position) - 1
+            if i != last:
+                yield self._profs[i]
+                last = i
+            position = self._haystack.find(needle, position + 1)
+
+    def search(self, query):
+        """
+        Returns the professors whose names contain query, ignoring
+        accents, case and punctuation, as dicts ordered by name.
+        """
+        return [{"profid": profid, "profname": profname,
+                 "courseids": sorted(courseids)}
+                for _, profname, profid, courseids in self._matches(query)]
+
+    def courseids(self, query):
+        """
+        Returns the sorted courseids taught by any professor whose name
+        contains query.
+        """
+        found = set()
+        for _, _, _, courseids in self._matches(query):
+            found |= courseids
+        return sorted(found)
+
+    def estimate_rows(self, courseids):
+        """
+        Returns how many class overview rows belong to courseids.
+        """
+        return sum(self._rows_per_course.get(courseid, 0)
+                   for courseid in courseids)
+
+
+def build_prof_index(conn):
+    """
+    Builds a ProfIndex from the database connection conn.
+    """
+    profs = conn.execute("SELECT profid, profname FROM profs").fetchall()
+    courses_profs = conn.execute(
+        "SELECT courseid, profid FROM coursesprofs").fetchall()
+    rows_per_course = dict(conn.execute("""
+        SELECT cl.courseid, COUNT(*)
+        FROM classes cl
+        JOIN crosslistings cr ON cl.courseid = cr.courseid
+        GROUP BY cl.courseid
+    """).fetchall())
+    return ProfIndex(profs, courses_profs, rows_per_course)
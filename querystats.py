@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+"""
+Per-field statistics over the class overview rows of a registrar
+database, used to estimate how many rows a search will return before
+running it.
+"""
+
+from collections import Counter
+
+OVERVIEW_FIELDS = ("dept", "coursenum", "area", "title")
+
+
+class OverviewStats:
+    """
+    Holds the full (unfiltered) class overview result, as OverviewRows,
+    and, for each searchable field, how many overview rows have each
+    distinct value.
+    """
+
+    def __init__(self, rows, body=None):
+        self.rows = rows
+        self.total = len(rows)
+        self.body = body
+        self._values = {}
+        for field in OVERVIEW_FIELDS:
+            counts = Counter((getattr(row, field) or "").lower()
+                             for row in rows)
+            self._values[field] = list(counts.items())
+
+    def selectivity(self, field, value):
+        """
+        Returns the fraction of overview rows whose field contains
+        value, ignoring case, the way the LIKE filters match. Empty
+        values match every row.
+        """
+        if not value or value.strip() == "" or self.total == 0:
+            return 1.0
+        value = value.lower()
+        matched = sum(count for text, count in self._values[field]
+                      if value in text)
+        return matched / self.total
+
+    def estimate(self, dept, coursenum, area, title):
+        """
+        Estimates the number of overview rows matching all of the given
+        raw filter values, assuming the fields are independent. The
+        estimate is exact when at most one filter is non-empty.
+        """
+        fraction = 1.0
+        for field, value in zip(OVERVIEW_FIELDS,
+                                (dept, coursenum, area, title)):
+            fraction *= self.selectivity(field, value)
+        return round(self.total * fraction)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+Implements request admission control for the registrar application:
+a per-client token-bucket rate limiter and a priority-aware limiter
+on the number of concurrent database queries.
+"""
+
+import math
+import time
+import threading
+
+
+def retry_after_seconds(delay):
+    """
+    Converts a delay in (fractional) seconds into the whole number of
+    seconds used by the HTTP Retry-After header, never less than one.
+    """
+    return max(1, math.ceil(delay))
+
+
+class TokenBucketLimiter:
+    """
+    Per-client token buckets. Each client may make up to burst
+    requests at once, after which its bucket refills at rate tokens
+    per second.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self._rate = rate
+        self._burst = burst
+        self._max_clients = max_clients
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, client):
+        """
+        Takes one token from the bucket of client. Returns a tuple of
+        whether the request is allowed and, if it is not, how many
+        seconds the client should wait before trying again.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(client, (self._burst, now))
+            tokens = min(self._burst, tokens + (now - last) * self._rate)
+            if tokens >= 1:
+                self._buckets[client] = (tokens - 1, now)
+                allowed, wait = True, 0.0
+            else:
+                self._buckets[client] = (tokens, now)
+                allowed, wait = False, (1 - tokens) / self._rate
+            if len(self._buckets) > self._max_clients:
+                self._prune(now)
+        return (allowed, wait)
+
+    def _prune(self, now):
+        """
+        Forgets clients whose buckets have refilled completely, since
+        they are indistinguishable from new clients.
+        """
+        full_after = self._burst / self._rate
+        self._buckets = {
+            client: (tokens, last)
+            for client, (tokens, last) in self._buckets.items()
+            if now - last < full_after
+        }
+
+
+class AdmissionController:
+    """
+    Limits the number of requests doing database work at once. Broad
+    queries may only occupy broad_capacity of the capacity slots and
+    never jump ahead of waiting narrow requests, so an overloaded
+    server sheds broad queries first.
+    """
+
+    def __init__(self, capacity, broad_capacity, timeout,
+                 broad_timeout):
+        self._capacity = capacity
+        self._broad_capacity = broad_capacity
+        self._timeout = timeout
+        self._broad_timeout = broad_timeout
+        self._active = 0
+        self._active_broad = 0
+        self._waiting_narrow = 0
+        self._cond = threading.Condition()
+
+    def _blocked(self, broad):
+        if self._active >= self._capacity:
+            return True
+        if broad:
+            return (self._active_broad >= self._broad_capacity
+                    or self._waiting_narrow > 0)
+        return False
+
+    def acquire(self, broad):
+        """
+        Waits for a free slot. Returns True once the request has been
+        admitted, or False if no slot became free in time.
+        """
+        timeout = self._broad_timeout if broad else self._timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if not broad:
+                self._waiting_narrow += 1
+            try:
+                while self._blocked(broad):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                if not broad:
+                    self._waiting_narrow -= 1
+            self._active += 1
+            if broad:
+                self._active_broad += 1
+            return True
+
+    def release(self, broad):
+        """
+        Frees the slot taken by a previous successful acquire.
+        """
+        with self._cond:
+            self._active -= 1
+            if broad:
+                self._active_broad -= 1
+            self._cond.notify_all()
+
+    def retry_after(self, broad):
+        """
+        Returns a suggested wait in seconds for a rejected request.
+        """
+        return self._broad_timeout * 4 if broad else self._timeout
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+"""
+Room occupancy queries over the classes table. For every room and day
+the meetings held there are kept as intervals sorted by start time,
+with the running maximum of their end times, so that asking what is in
+a room at some time, or which rooms are free during a window, is a
+bisect per room and day.
+"""
+
+import bisect
+from array import array
+from schedule import DAY_BITS, parse_days, parse_time
+
+
+class RoomDay:
+    """
+    The meetings in one room on one day, sorted by start time.
+    """
+
+    def __init__(self, meetings):
+        meetings = sorted(meetings)
+        self.starts = array("h", (start for start, _, _ in meetings))
+        self.ends = array("h", (end for _, end, _ in meetings))
+        self.classids = array("i", (classid for _, _, classid in meetings))
+        # latest[k] is the latest end of the first k + 1 meetings.
+        self.latest = array("h")
+        latest = 0
+        for end in self.ends:
+            latest = max(latest, end)
+            self.latest.append(latest)
+
+    def at(self, minute):
+        """
+        Yields the classids of the meetings in progress at minute.
+        """
+        k = bisect.bisect_right(self.starts, minute) - 1
+        while k >= 0 and self.latest[k] > minute:
+            if self.ends[k] > minute:
+                yield self.classids[k]
+            k -= 1
+
+    def busy(self, start, end):
+        """
+        Returns True if a meeting takes up part of [start, end).
+        """
+        k = bisect.bisect_left(self.starts, end)
+        return k > 0 and self.latest[k - 1] > start
+
+
+class RoomIndex:
+    """
+    The occupancy of every room that classes meet in, by day.
+    """
+
+    def __init__(self, classes):
+        meetings = {}
+        self._times = {}
+        for classid, bldg, roomnum, days, starttime, endtime in classes:
+            if not bldg or not roomnum:
+                continue
+            room = (bldg, roomnum)
+            meetings.setdefault(room, {})
+            try:
+                mask = parse_days(days)
+                start = parse_time(starttime)
+                end = parse_time(endtime)
+            except ValueError:
+                continue
+            if start is None or end is None or end <= start:
+                continue
+            self._times[classid] = (start, {"classid": classid,
+                                            "days": days,
+                                            "starttime": starttime,
+                                            "endtime": endtime})
+            for bit in DAY_BITS.values():
+                if mask & bit:
+                    meetings[room].setdefault(bit, []).append(
+                        (start, end, classid))
+        self._rooms = {room: {bit: RoomDay(day)
+                              for bit, day in days.items()}
+                       for room, days in sorted(meetings.items())}
+
+    def __contains__(self, room):
+        return room in self._rooms
+
+    def occupants(self, room, days_mask, minute=None):
+        """
+        Returns the meeting times of the classes in room on any of the
+        days in days_mask, as dicts ordered by start time and classid.
+        If minute is not None, only the classes in progress then are
+        returned.
+        """
+        found = set()
+        for bit, day in self._rooms[room].items():
+            if days_mask & bit:
+                if minute is None:
+                    found.update(day.classids)
+                else:
+                    found.update(day.at(minute))
+        times = sorted((self._times[classid] for classid in found),
+                       key=lambda time: (time[0], time[1]["classid"]))
+        return [info for _, info in times]
+
+    def free(self, days_mask, start, end):
+        """
+        Returns the sorted (bldg, roomnum) pairs of the rooms with no
+        meeting during [start, end) on any of the days in days_mask.
+        """
+        return [room for room, days in self._rooms.items()
+                if not any(day.busy(start, end)
+                           for bit, day in days.items()
+                           if days_mask & bit)]
+
+
+def build_room_index(conn):
+    """
+    Builds a RoomIndex from the database connection conn.
+    """
+    return RoomIndex(conn.execute("""
+        SELECT classid, bldg, roomnum, days, starttime, endtime
+        FROM classes
+    """).fetchall())
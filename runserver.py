@@ -5,15 +5,125 @@ Implements a Flask web application for Princeton University's
 registrar system.
 """
 
+import os
 import sys
+import json
+import time
 import argparse
+import heapq
 import sqlite3
-from flask import Flask, request, jsonify, send_file
+import itertools
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify, abort, g
+from ratelimit import (TokenBucketLimiter, AdmissionController,
+                       retry_after_seconds)
+from catalog import VersionedIndex, database_version
+from querystats import OverviewStats
+from searchstream import SearchSessions, sse_event
+from assets import AssetPipeline
+from suggest import build_suggestions, MAX_SUGGESTIONS
+from profindex import build_prof_index, normalize_name
+from schedule import (build_schedule_index, parse_days, parse_time,
+                      DAY_BITS)
+from rooms import build_room_index
+from export import export_records, gzip_chunks, EXPORT_FORMATS
+from terms import Terms
+from accesslog import AccessLogWriter, normalize_query
+from overviews import overview_row, overview_dicts, encode_overviews
 
 app = Flask(__name__)
 
 DATABASE = "reg.sqlite"
 
+# The name of the term served from DATABASE, which requests without a
+# term parameter use; the most term databases open at once; idle
+# connections kept per term; and threads for cross-term searches.
+DEFAULT_TERM = "current"
+MAX_OPEN_TERMS = 4
+TERM_POOL_SIZE = 8
+MAX_TERM_WORKERS = 4
+
+# Per-client rate limit on /regoverviews: requests per second and the
+# size of the burst a client may send at once.
+RATE_LIMIT_PER_SECOND = 10
+RATE_LIMIT_BURST = 20
+
+# Concurrent database queries, how many of them may be broad queries,
+# and how long (in seconds) narrow and broad requests wait for a slot.
+MAX_DB_CONCURRENCY = 8
+MAX_BROAD_CONCURRENCY = 4
+ADMISSION_TIMEOUT = 2.0
+BROAD_ADMISSION_TIMEOUT = 0.25
+
+# Concurrent exports, which hold their slot until the client has
+# downloaded the whole catalog, how long (in seconds) an export waits
+# for one, and how long a rejected client is asked to wait.
+MAX_EXPORT_CONCURRENCY = 2
+EXPORT_ADMISSION_TIMEOUT = 0.25
+EXPORT_RETRY_AFTER = 5
+
+# Searches estimated to return more rows than this count as broad.
+BROAD_QUERY_ROWS = 200
+
+# The most rows /regoverviews returns; larger results are truncated
+# and flagged so the client can ask for a narrower search.
+MAX_OVERVIEW_ROWS = 5000
+
+OVERVIEWS_QUERY = """
+    SELECT DISTINCT cl.classid, cr.dept, cr.coursenum, c.title, c.area
+    FROM classes cl
+    JOIN courses c ON cl.courseid = c.courseid
+    JOIN crosslistings cr ON c.courseid = cr.courseid
+    WHERE cr.dept LIKE ? ESCAPE '\\'
+    AND cr.coursenum LIKE ? ESCAPE '\\'
+    AND c.area LIKE ? ESCAPE '\\'
+    AND c.title LIKE ? ESCAPE '\\'
+    AND (? IS NULL OR c.courseid IN (SELECT value FROM json_each(?)))
+    AND (? IS NULL OR cl.classid IN (SELECT value FROM json_each(?)))
+    ORDER BY cr.dept, cr.coursenum, cl.classid
+    LIMIT ?
+"""
+
+# The /regoverviews meeting-time filters: the days a class may meet on,
+# the earliest start and latest end times, and the classids (of a
+# schedule) a class must not conflict with.
+SCHEDULE_FILTERS = ("days", "after", "before", "noconflict")
+
+# Incremental search: the most open streams, seconds between keepalive
+# comments on an idle stream, and the sizes of the first and later
+# batches of rows pushed for a query.
+MAX_SEARCH_SESSIONS = 100
+STREAM_KEEPALIVE = 15
+STREAM_FIRST_BATCH = 25
+STREAM_BATCH = 250
+
+# Cache-Control for assets requested by their content-hashed names,
+# which never change, and for everything else served as a file.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# The access log is rotated when it reaches this size, keeping this
+# many old logs.
+ACCESS_LOG_MAX_BYTES = 16 * 1024 * 1024
+ACCESS_LOG_BACKUPS = 5
+
+SERVER_ERROR_MESSAGE = ("A server error occurred. "
+                        "Please contact the system administrator.")
+
+rate_limiter = TokenBucketLimiter(RATE_LIMIT_PER_SECOND,
+                                  RATE_LIMIT_BURST)
+admission = AdmissionController(MAX_DB_CONCURRENCY,
+                                MAX_BROAD_CONCURRENCY,
+                                ADMISSION_TIMEOUT,
+                                BROAD_ADMISSION_TIMEOUT)
+export_slots = threading.BoundedSemaphore(MAX_EXPORT_CONCURRENCY)
+search_sessions = SearchSessions(MAX_SEARCH_SESSIONS)
+asset_pipeline = AssetPipeline(os.path.join(app.root_path, "assets"),
+                               os.path.join(app.root_path, "index.html"))
+access_log = None
+
 
 def string_handler(s):
     """
@@ -30,14 +140,347 @@ def string_handler(s):
     return f"%{s}%"
 
 
+def overviews_result(rows, estimated):
+    """
+    Returns the /regoverviews JSON document for rows. If there are more
+    than MAX_OVERVIEW_ROWS rows, only that many are kept and a third
+    element flags the truncation along with the estimated full size.
+    """
+    if len(rows) <= MAX_OVERVIEW_ROWS:
+        return [True, rows]
+    return [True, rows[:MAX_OVERVIEW_ROWS],
+            {"truncated": True, "limit": MAX_OVERVIEW_ROWS,
+             "estimated": max(estimated, len(rows))}]
+
+
+def configure(database, max_overview_rows, rate_limit, other_terms=(),
+              access_log_path=None):
+    """
+    Sets the database of the default term, the most rows /regoverviews
+    returns, the per-client rate limit (0 disables it), the other
+    terms served as (name, database) pairs, and the file to write the
+    access log to (None for no access log).
+    """
+    global DATABASE, MAX_OVERVIEW_ROWS, rate_limiter, terms, access_log
+    DATABASE = database
+    terms = Terms({**dict(other_terms), DEFAULT_TERM: database},
+                  DEFAULT_TERM, MAX_OPEN_TERMS, TERM_POOL_SIZE,
+                  forget_database)
+    if access_log is not None:
+        access_log.close()
+    access_log = None
+    if access_log_path is not None:
+        access_log = AccessLogWriter(access_log_path, ACCESS_LOG_MAX_BYTES,
+                                     ACCESS_LOG_BACKUPS)
+    MAX_OVERVIEW_ROWS = max_overview_rows
+    rate_limiter = None
+    if rate_limit > 0:
+        rate_limiter = TokenBucketLimiter(rate_limit, RATE_LIMIT_BURST)
+
+
+def _build_overview_stats(conn):
+    """
+    Runs the unfiltered overview query, which is the most expensive
+    one, and precomputes its response along with per-field statistics.
+    """
+    conn.row_factory = overview_row
+    cursor = conn.execute(OVERVIEWS_QUERY,
+                          overview_params(["", "", "", ""], None, None,
+                                          -1))
+    rows = cursor.fetchall()
+    return OverviewStats(rows,
+                         encode_overviews(overviews_result(rows, len(rows))))
+
+
+overview_stats = VersionedIndex(_build_overview_stats)
+suggestions = VersionedIndex(build_suggestions)
+prof_index = VersionedIndex(build_prof_index)
+schedule_index = VersionedIndex(build_schedule_index)
+room_index = VersionedIndex(build_room_index)
+
+
+def forget_database(path):
+    """
+    Drops every cached index of the database at path.
+    """
+    for index in (overview_stats, suggestions, prof_index, schedule_index,
+                  room_index):
+        index.discard(path)
+
+
+terms = Terms({DEFAULT_TERM: DATABASE}, DEFAULT_TERM, MAX_OPEN_TERMS,
+              TERM_POOL_SIZE, forget_database)
+term_executor = ThreadPoolExecutor(MAX_TERM_WORKERS)
+
+
+def request_term():
+    """
+    Returns the Term named by the request's term parameter (the
+    default term if there is none), or None if there is no such term.
+    """
+    return terms.get(request.values.get("term", ""))
+
+
+def unknown_term_response():
+    """
+    Builds the response to a request naming a term that does not
+    exist.
+    """
+    return jsonify([False,
+                    f"no term {request.values.get('term')} exists"])
+
+
+def overview_params(raw, courseids, classids, limit):
+    """
+    Returns the parameters of OVERVIEWS_QUERY for the raw dept,
+    coursenum, area and title filters, the courseids a professor
+    filter allows and the classids the meeting-time filters allow
+    (None for no such filter), and a row limit.
+    """
+    allowed = None if courseids is None else json.dumps(courseids)
+    classes = None if classids is None else json.dumps(classids)
+    return (*(string_handler(value) for value in raw), allowed, allowed,
+            classes, classes, limit)
+
+
+def parse_classids(text):
+    """
+    Returns the integer classids in the comma-separated string text.
+    Raises ValueError if one of them is not an integer.
+    """
+    try:
+        return [int(value) for value in text.split(",")
+                if value.strip() != ""]
+    except ValueError:
+        raise ValueError("non-integer classid") from None
+
+
+def plan_schedule(term, schedule):
+    """
+    Returns the sorted classids of term that the raw meeting-time
+    filters schedule (days, after, before and noconflict) allow, or
+    None if they are all empty. Raises ValueError, with a message for
+    the client, if a filter is invalid.
+    """
+    days, after, before, noconflict = schedule
+    if all(value.strip() == "" for value in schedule):
+        return None
+    days_mask = None if days.strip() == "" else parse_days(days)
+    start, end = parse_time(after), parse_time(before)
+    busy = parse_classids(noconflict)
+
+    index = schedule_index.get(term.path)
+    for classid in busy:
+        if classid not in index:
+            raise ValueError(f"no class with classid {classid} exists")
+    excluded = index.conflicting(busy)
+    return sorted(classid
+                  for classid in index.matching(days_mask, start, end)
+                  if classid not in excluded)
+
+
+def plan_overviews(term, raw, prof, schedule):
+    """
+    Prepares an overview search in term for the raw dept, coursenum,
+    area and title filters, the professor filter prof and the meeting-time
+    filters schedule. Returns the overview statistics, the courseids
+    the professor filter allows and the classids the meeting-time
+    filters allow (each None if there is no such filter), and the
+    estimated number of result rows. A professor filter that is only
+    spaces and punctuation is no filter. Raises ValueError if a
+    meeting-time filter is invalid.
+    """
+    stats = overview_stats.get(term.path)
+    estimated = stats.estimate(*raw)
+    courseids = None
+    if normalize_name(prof) != "":
+        index = prof_index.get(term.path)
+        courseids = index.courseids(prof)
+        estimated = min(estimated, index.estimate_rows(courseids))
+    classids = plan_schedule(term, schedule)
+    if classids is not None:
+        estimated = min(estimated, schedule_index.get(term.path)
+                        .estimate_rows(classids))
+    return (stats, courseids, classids, estimated)
+
+
+def unfiltered(raw, courseids, classids):
+    """
+    Returns True if an overview search with the raw dept, coursenum,
+    area and title filters and the allowed courseids and classids is
+    the unfiltered one, whose results are precomputed.
+    """
+    return (courseids is None and classids is None
+            and all(value.strip() == "" for value in raw))
+
+
+def fetch_overviews(term, raw, courseids, classids):
+    """
+    Runs the class overview query in term and returns up to
+    MAX_OVERVIEW_ROWS + 1 rows as OverviewRows.
+    """
+    with term.pool.connection() as conn:
+        conn.row_factory = overview_row
+        cursor = conn.execute(OVERVIEWS_QUERY, overview_params(
+            raw, courseids, classids, MAX_OVERVIEW_ROWS + 1))
+        return cursor.fetchall()
+
+
+def search_term(term, raw, prof, schedule):
+    """
+    Runs one term's part of a cross-term overview search. Returns its
+    rows and its estimated number of rows.
+    """
+    stats, courseids, classids, estimated = plan_overviews(
+        term, raw, prof, schedule)
+    if courseids == [] or classids == []:
+        return ([], 0)
+    if unfiltered(raw, courseids, classids):
+        rows = stats.rows[:MAX_OVERVIEW_ROWS + 1]
+    else:
+        rows = fetch_overviews(term, raw, courseids, classids)
+    return (rows, estimated)
+
+
+def note_result(rows, cache):
+    """
+    Records the number of result rows of the current request and
+    whether it was answered from precomputed or in-memory data
+    ("hit"), by querying the database ("miss") or with 304 Not
+    Modified ("not-modified"), for the access log.
+    """
+    g.log_rows = rows
+    g.log_cache = cache
+
+
+@contextlib.contextmanager
+def timed(name):
+    """
+    Adds the time spent in the block to the current request's timing
+    called name, in milliseconds, for the access log.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.log_timings[name] = round(g.log_timings.get(name, 0)
+                                    + (time.perf_counter() - start) * 1000,
+                                    3)
+
+
+@app.before_request
+def start_access_log():
+    """
+    Starts timing the request for the access log.
+    """
+    g.log_start = time.perf_counter()
+    g.log_rows = None
+    g.log_cache = None
+    g.log_timings = {}
+
+
+@app.after_request
+def write_access_log(response):
+    """
+    Logs the request once its response has been sent. The size of a
+    streamed response is counted as it is sent.
+    """
+    if access_log is None:
+        return response
+    writer = access_log
+    record = {
+        "time": round(time.time(), 3),
+        "method": request.method,
+        "route": request.url_rule.rule if request.url_rule else None,
+        "query": normalize_query(request.values),
+        "status": response.status_code,
+        "rows": g.log_rows,
+        "cache": g.log_cache,
+        "timings": g.log_timings,
+        "streamed": response.is_streamed,
+    }
+    start = g.log_start
+    sent = [0]
+    if response.is_streamed:
+        chunks = response.response
+
+        def counted():
+            try:
+                for chunk in chunks:
+                    sent[0] += len(chunk)
+                    yield chunk
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+
+        response.response = counted()
+    else:
+        sent[0] = response.content_length or 0
+
+    def finish():
+        record["bytes"] = sent[0]
+        record["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        writer.write(record)
+
+    response.call_on_close(finish)
+    return response
+
+
+def busy_response(status, message, delay):
+    """
+    Builds a fast rejection response for an overloaded server, with a
+    Retry-After header telling the client when to try again.
+    """
+    response = jsonify([False, message])
+    response.status_code = status
+    response.headers["Retry-After"] = str(retry_after_seconds(delay))
+    return response
+
+
+def asset_response(asset, immutable):
+    """
+    Builds a response for a built asset, using its precompressed copy
+    if the client accepts gzip. Answers conditional requests with 304
+    Not Modified.
+    """
+    gzipped = request.accept_encodings["gzip"] > 0
+    response = app.response_class(
+        asset.gzip_body if gzipped else asset.body,
+        mimetype=asset.mimetype)
+    if gzipped:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL)
+    response.set_etag(asset.etag + ("-gzip" if gzipped else ""))
+    response = response.make_conditional(request)
+    note_result(None,
+                "not-modified" if response.status_code == 304 else "hit")
+    return response
+
+
 @app.route("/")
 @app.route("/index")
 def index():
     """
-    Serve the main HTML page for the registrar application.
-    Returns Flask response object containing index.html
+    Serve the main HTML page for the registrar application, with its
+    asset references pointing at content-hashed asset names.
+    """
+    page, _ = asset_pipeline.current()
+    return asset_response(page, False)
+
+
+@app.route("/assets/<name>")
+def static_asset(name):
+    """
+    Serve a built stylesheet or script. Assets requested by their
+    content-hashed names may be cached forever.
     """
-    return send_file("index.html")
+    _, assets = asset_pipeline.current()
+    asset = assets.get(name)
+    if asset is None:
+        abort(404)
+    return asset_response(asset, name == asset.hashed_name)
 
 
 @app.route("/regoverviews")
@@ -47,41 +490,530 @@ def reg_overviews():
     joins to combine data from database tables, and returns
     a JSON response.
     """
-    dept = string_handler(request.args.get("dept", ""))
-    coursenum = string_handler(request.args.get("coursenum", ""))
-    area = string_handler(request.args.get("area", ""))
-    title = string_handler(request.args.get("title", ""))
+    if rate_limiter is not None:
+        allowed, wait = rate_limiter.consume(request.remote_addr)
+        if not allowed:
+            return busy_response(429, "Too many requests. "
+                                 "Please slow down.", wait)
 
+    raw = [request.args.get(name, "")
+           for name in ("dept", "coursenum", "area", "title")]
+    prof = request.args.get("prof", "")
+    schedule = [request.args.get(name, "") for name in SCHEDULE_FILTERS]
+    if request.args.get("terms", "").strip() != "":
+        return _search_terms(request.args["terms"], raw, prof, schedule)
+
+    term = request_term()
+    if term is None:
+        return unknown_term_response()
     try:
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with timed("plan_ms"):
+            stats, courseids, classids, estimated = plan_overviews(
+                term, raw, prof, schedule)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+    except ValueError as e:
+        return jsonify([False, str(e)])
+
+    if unfiltered(raw, courseids, classids):
+        note_result(min(stats.total, MAX_OVERVIEW_ROWS), "hit")
+        return app.response_class(stats.body,
+                                  mimetype="application/json")
+    if courseids == [] or classids == []:
+        note_result(0, "hit")
+        return jsonify([True, []])
+
+    broad = estimated > BROAD_QUERY_ROWS
+    with timed("admission_ms"):
+        admitted = admission.acquire(broad)
+    if not admitted:
+        return busy_response(503, "The server is busy. "
+                             "Please try again shortly.",
+                             admission.retry_after(broad))
+    try:
+        return _query_overviews(term, raw, courseids, classids,
+                                estimated)
+    finally:
+        admission.release(broad)
 
-        query = """
-            SELECT DISTINCT cl.classid, cr.dept, cr.coursenum, c.title, c.area
-            FROM classes cl
-            JOIN courses c ON cl.courseid = c.courseid
-            JOIN crosslistings cr ON c.courseid = cr.courseid
-            WHERE cr.dept LIKE ? ESCAPE '\\'
-            AND cr.coursenum LIKE ? ESCAPE '\\'
-            AND c.area LIKE ? ESCAPE '\\'
-            AND c.title LIKE ? ESCAPE '\\'
-            ORDER BY cr.dept, cr.coursenum, cl.classid
-        """
-
-        cursor.execute(query, (dept, coursenum, area, title))
-        rows = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return jsonify([True, rows])
-
-    except sqlite3.Error as e:
+
+def _query_overviews(term, raw, courseids, classids, estimated):
+    """
+    Runs the class overview query in term for the given raw filter
+    values and allowed courseids and classids and returns the JSON
+    response.
+    """
+    try:
+        with timed("db_ms"):
+            rows = fetch_overviews(term, raw, courseids, classids)
+        note_result(min(len(rows), MAX_OVERVIEW_ROWS), "miss")
+        return app.response_class(
+            encode_overviews(overviews_result(rows, estimated)),
+            mimetype="application/json")
+
+    except (OSError, sqlite3.Error) as e:
         print(f"Database error: {e}", file=sys.stderr)
-        return jsonify([False, "A server error occurred. "
-                       "Please contact the system administrator."])
+        return jsonify([False, SERVER_ERROR_MESSAGE])
     except (ValueError, TypeError) as e:
         print(f"Input error: {e}", file=sys.stderr)
-        return jsonify([False, "A server error occurred. "
-                       "Please contact the system administrator."])
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+
+
+def _search_terms(names, raw, prof, schedule):
+    """
+    Runs an overview search in several terms at once (names is a
+    comma-separated list of terms, or "all") and returns the JSON
+    response merging their sorted results. Each row names its term.
+    The terms are held open until the search finishes, so at most
+    MAX_OPEN_TERMS of them can be searched at once.
+    """
+    if names.strip() == "all":
+        names = terms.names()
+    else:
+        names = list(dict.fromkeys(name.strip() for name in names.split(",")
+                                   if name.strip() != ""))
+    if not names:
+        return jsonify([False, "missing terms"])
+    known = set(terms.names())
+    for name in names:
+        if name not in known:
+            return jsonify([False, f"no term {name} exists"])
+    if len(names) > MAX_OPEN_TERMS:
+        return jsonify([False, f"at most {MAX_OPEN_TERMS} terms can be "
+                        "searched at once"])
+
+    if not admission.acquire(True):
+        return busy_response(503, "The server is busy. "
+                             "Please try again shortly.",
+                             admission.retry_after(True))
+    try:
+        with terms.holding(names) as selected, timed("db_ms"):
+            results = list(term_executor.map(
+                lambda term: search_term(term, raw, prof, schedule),
+                selected))
+    except (OSError, sqlite3.Error) as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+    except ValueError as e:
+        return jsonify([False, str(e)])
+    finally:
+        admission.release(True)
+
+    merged = heapq.merge(
+        *([(row, term.name) for row in rows]
+          for (rows, _), term in zip(results, selected)),
+        key=lambda item: (item[0].dept, item[0].coursenum,
+                          item[0].classid))
+    rows = [dict(row._asdict(), term=name) for row, name in
+            itertools.islice(merged, MAX_OVERVIEW_ROWS + 1)]
+    note_result(min(len(rows), MAX_OVERVIEW_ROWS), "miss")
+    return jsonify(overviews_result(
+        rows, sum(estimated for _, estimated in results)))
+
+
+@app.route("/regoverviews/stream")
+def reg_overviews_stream():
+    """
+    Open an incremental search stream. The first event names the
+    session to post query updates to; the stream then carries the
+    results of the latest query as they are read.
+    """
+    created = search_sessions.create()
+    if created is None:
+        return busy_response(503, "The server is busy. "
+                             "Please try again shortly.",
+                             STREAM_KEEPALIVE)
+    session_id, session = created
+
+    def generate():
+        try:
+            yield sse_event("session", {"session": session_id})
+            while True:
+                item = session.next_query(STREAM_KEEPALIVE)
+                if item is None:
+                    yield ": keepalive\n\n"
+                    continue
+                generation, (seq, term, raw, prof, schedule) = item
+                yield from _stream_overviews(session, generation, seq,
+                                             term, raw, prof, schedule)
+        finally:
+            search_sessions.remove(session_id)
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache",
+                             "X-Accel-Buffering": "no"})
+
+
+@app.route("/regoverviews/stream/<session_id>", methods=["POST"])
+def reg_overviews_update(session_id):
+    """
+    Submit a new query to an incremental search session, superseding
+    the previous one.
+    """
+    session = search_sessions.get(session_id)
+    if session is None:
+        response = jsonify([False, "unknown search session"])
+        response.status_code = 404
+        return response
+
+    if rate_limiter is not None:
+        allowed, wait = rate_limiter.consume(request.remote_addr)
+        if not allowed:
+            return busy_response(429, "Too many requests. "
+                                 "Please slow down.", wait)
+
+    term = request_term()
+    if term is None:
+        return unknown_term_response()
+    seq = request.values.get("seq", "")
+    raw = [request.values.get(name, "")
+           for name in ("dept", "coursenum", "area", "title")]
+    prof = request.values.get("prof", "")
+    schedule = [request.values.get(name, "")
+                for name in SCHEDULE_FILTERS]
+    session.submit((seq, term, raw, prof, schedule))
+    return jsonify([True, seq])
+
+
+def _stream_overviews(session, generation, seq, term, raw, prof,
+                      schedule):
+    """
+    Yields the events answering one incremental search query in term:
+    batches of rows as soon as they are read, then a done event. Stops
+    quietly if a newer query arrives in the meantime.
+    """
+    try:
+        stats, courseids, classids, estimated = plan_overviews(
+            term, raw, prof, schedule)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        yield sse_event("failure", {"seq": seq,
+                                    "message": SERVER_ERROR_MESSAGE})
+        return
+    except ValueError as e:
+        yield sse_event("failure", {"seq": seq, "message": str(e)})
+        return
+
+    if courseids == [] or classids == []:
+        yield sse_event("rows", {"seq": seq, "first": True, "rows": []})
+        yield sse_event("done", {"seq": seq, "info": []})
+        return
+
+    if unfiltered(raw, courseids, classids):
+        rows = stats.rows[:MAX_OVERVIEW_ROWS]
+        for start in range(0, max(len(rows), 1), STREAM_BATCH):
+            if not session.is_current(generation):
+                return
+            yield sse_event("rows", {
+                "seq": seq, "first": start == 0,
+                "rows": overview_dicts(
+                    rows[start:start + STREAM_BATCH])})
+        info = overviews_result(stats.rows, stats.total)[2:]
+        yield sse_event("done", {"seq": seq, "info": info})
+        return
+
+    broad = estimated > BROAD_QUERY_ROWS
+    if not admission.acquire(broad):
+        yield sse_event("busy", {
+            "seq": seq,
+            "retry": retry_after_seconds(admission.retry_after(broad))
+            * 1000})
+        return
+    conn = None
+    try:
+        if not session.is_current(generation):
+            return
+        conn = term.pool.acquire()
+        conn.row_factory = overview_row
+        with session.running(conn), contextlib.closing(conn.execute(
+                OVERVIEWS_QUERY, overview_params(
+                    raw, courseids, classids,
+                    MAX_OVERVIEW_ROWS + 1))) as cursor:
+            fetched = 0
+            sent = 0
+            size = STREAM_FIRST_BATCH
+            while True:
+                rows = cursor.fetchmany(size)
+                if not session.is_current(generation):
+                    return
+                fetched += len(rows)
+                batch = overview_dicts(rows[:MAX_OVERVIEW_ROWS - sent])
+                if batch or sent == 0:
+                    yield sse_event("rows", {"seq": seq,
+                                             "first": sent == 0,
+                                             "rows": batch})
+                sent += len(batch)
+                if len(rows) < size:
+                    break
+                size = STREAM_BATCH
+        info = []
+        if fetched > MAX_OVERVIEW_ROWS:
+            info = [{"truncated": True, "limit": MAX_OVERVIEW_ROWS,
+                     "estimated": max(estimated, fetched)}]
+        yield sse_event("done", {"seq": seq, "info": info})
+
+    except (OSError, sqlite3.Error) as e:
+        if session.is_current(generation):
+            print(f"Database error: {e}", file=sys.stderr)
+            yield sse_event("failure", {"seq": seq,
+                                        "message": SERVER_ERROR_MESSAGE})
+    finally:
+        if conn is not None:
+            term.pool.release(conn)
+        admission.release(broad)
+
+
+@app.route("/regterms")
+def reg_terms():
+    """
+    Handle API requests for the terms served and returns a JSON
+    response listing their names and the default term.
+    """
+    return jsonify([True, {"terms": terms.names(),
+                           "default": terms.default}])
+
+
+@app.route("/suggest")
+def suggest():
+    """
+    Handle API requests for typeahead completions of a search field
+    (dept, coursenum or area) and returns a JSON response ranking the
+    matching values by their number of classes.
+    """
+    field = request.args.get("field", "")
+    prefix = request.args.get("prefix", "").strip()
+    try:
+        limit = int(request.args.get("limit", MAX_SUGGESTIONS))
+    except ValueError:
+        return jsonify([False, "non-integer limit"])
+
+    term = request_term()
+    if term is None:
+        return unknown_term_response()
+    try:
+        vocabularies = suggestions.get(term.path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+
+    vocabulary = vocabularies.get(field)
+    if vocabulary is None:
+        return jsonify([False, f"no suggestions for field {field}"])
+    completions = vocabulary.complete(prefix, max(limit, 0))
+    note_result(len(completions), "hit")
+    return jsonify([True, completions])
+
+
+@app.route("/regprofs")
+def reg_profs():
+    """
+    Handle API requests for professors whose names contain the given
+    name, ignoring accents, case and punctuation, and returns a JSON
+    response listing each with the courseids they teach.
+    """
+    name = request.args.get("name", "")
+    term = request_term()
+    if term is None:
+        return unknown_term_response()
+    try:
+        index = prof_index.get(term.path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+    profs = index.search(name)
+    note_result(len(profs), "hit")
+    return jsonify([True, profs])
+
+
+@app.route("/regconflicts")
+def reg_conflicts():
+    """
+    Handle API requests to check a schedule, given as comma-separated
+    classids, and returns a JSON response listing the pairs of its
+    classes that conflict and every other class that conflicts with
+    one of them.
+    """
+    try:
+        classids = parse_classids(request.args.get("classids", ""))
+    except ValueError as e:
+        return jsonify([False, str(e)])
+
+    term = request_term()
+    if term is None:
+        return unknown_term_response()
+    try:
+        index = schedule_index.get(term.path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+
+    for classid in classids:
+        if classid not in index:
+            return jsonify([False,
+                            f"no class with classid {classid} exists"])
+    conflicting = index.conflicting(classids) - set(classids)
+    note_result(len(conflicting), "hit")
+    return jsonify([True, {"conflicts": index.conflicts_within(classids),
+                           "conflicting": sorted(conflicting)}])
+
+
+def parse_days_filter(days):
+    """
+    Returns the bitmask of the days in the days filter, all days if it
+    is empty. Raises ValueError if days is invalid.
+    """
+    if days.strip() == "":
+        return sum(DAY_BITS.values())
+    return parse_days(days)
+
+
+@app.route("/regroom")
+def reg_room():
+    """
+    Handle API requests for what is in a room (bldg and roomnum) on
+    the given days, optionally at a given time, and returns a JSON
+    response listing the meeting times of those classes.
+    """
+    bldg = request.args.get("bldg", "").strip()
+    roomnum = request.args.get("roomnum", "").strip()
+    if bldg == "" or roomnum == "":
+        return jsonify([False, "missing bldg or roomnum"])
+    try:
+        days_mask = parse_days_filter(request.args.get("days", ""))
+        minute = parse_time(request.args.get("time", ""))
+    except ValueError as e:
+        return jsonify([False, str(e)])
+
+    term = request_term()
+    if term is None:
+        return unknown_term_response()
+    try:
+        index = room_index.get(term.path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+
+    room = (bldg, roomnum)
+    if room not in index:
+        return jsonify([False, f"no room {bldg} {roomnum} exists"])
+    occupants = index.occupants(room, days_mask, minute)
+    note_result(len(occupants), "hit")
+    return jsonify([True, occupants])
+
+
+@app.route("/regfreerooms")
+def reg_free_rooms():
+    """
+    Handle API requests for the rooms with no class during a time
+    window (after to before) on any of the given days, and returns a
+    JSON response listing them by bldg and roomnum.
+    """
+    try:
+        days_mask = parse_days_filter(request.args.get("days", ""))
+        start = parse_time(request.args.get("after", ""))
+        end = parse_time(request.args.get("before", ""))
+    except ValueError as e:
+        return jsonify([False, str(e)])
+    if start is None or end is None:
+        return jsonify([False, "missing after or before"])
+    if end <= start:
+        return jsonify([False, "invalid time window"])
+
+    term = request_term()
+    if term is None:
+        return unknown_term_response()
+    try:
+        index = room_index.get(term.path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+
+    rooms = index.free(days_mask, start, end)
+    note_result(len(rooms), "hit")
+    return jsonify([True, [{"bldg": bldg, "roomnum": roomnum}
+                           for bldg, roomnum in rooms]])
+
+
+@app.route("/regexport")
+def reg_export():
+    """
+    Handle API requests for the whole catalog, every class with its
+    details, streamed as NDJSON, CSV or columnar JSON (format). The
+    ETag is the database version, so an unchanged catalog is answered
+    with 304 Not Modified without reading it. Exports take their own
+    slots rather than search admission slots, since they hold them
+    for as long as the client takes to download the catalog.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify([False, f"unknown export format {export_format}"])
+    mimetype, extension, encoder = EXPORT_FORMATS[export_format]
+    term = request_term()
+    if term is None:
+        return unknown_term_response()
+
+    try:
+        version = database_version(term.path)
+    except OSError as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+
+    gzipped = request.accept_encodings["gzip"] > 0
+    etag = (f"{term.name}-{version}-{export_format}"
+            + ("-gzip" if gzipped else ""))
+    if request.if_none_match.contains(etag):
+        note_result(0, "not-modified")
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    if not export_slots.acquire(timeout=EXPORT_ADMISSION_TIMEOUT):
+        return busy_response(503, "Too many exports are running. "
+                             "Please try again shortly.",
+                             EXPORT_RETRY_AFTER)
+    try:
+        conn = term.pool.acquire()
+    except (OSError, sqlite3.Error) as e:
+        export_slots.release()
+        print(f"Database error: {e}", file=sys.stderr)
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+
+    records = export_records(conn)
+
+    def generate():
+        try:
+            yield from encoder(records)
+        except sqlite3.Error as e:
+            # The status line has been sent; cut the export short.
+            print(f"Database error: {e}", file=sys.stderr)
+
+    def close():
+        # Closing the records ends their transaction even if the
+        # client stopped reading part way.
+        try:
+            body.close()
+            chunks.close()
+            records.close()
+        except sqlite3.Error as e:
+            print(f"Database error: {e}", file=sys.stderr)
+        finally:
+            term.pool.release(conn)
+            export_slots.release()
+
+    note_result(None, "miss")
+    chunks = generate()
+    body = gzip_chunks(chunks) if gzipped else chunks
+    response = Response(body, mimetype=mimetype)
+    if gzipped:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=catalog-{term.name}.{extension}")
+    response.set_etag(etag)
+    response.call_on_close(close)
+    return response
 
 
 @app.route("/regdetails")
@@ -99,8 +1031,30 @@ def reg_details():
     except ValueError:
         return jsonify([False, "non-integer classid"])
 
+    term = request_term()
+    if term is None:
+        return unknown_term_response()
+    with timed("admission_ms"):
+        admitted = admission.acquire(False)
+    if not admitted:
+        return busy_response(503, "The server is busy. "
+                             "Please try again shortly.",
+                             admission.retry_after(False))
+    try:
+        with timed("db_ms"):
+            return _query_details(term, classid)
+    finally:
+        admission.release(False)
+
+
+def _query_details(term, classid):
+    """
+    Runs the class details queries for classid in term and returns the
+    JSON response.
+    """
+    conn = None
     try:
-        conn = sqlite3.connect(DATABASE)
+        conn = term.pool.acquire()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -109,8 +1063,8 @@ def reg_details():
             FROM classes WHERE classid = ?
         """, (classid,))
         row = cursor.fetchone()
+        note_result(0 if row is None else 1, "miss")
         if row is None:
-            conn.close()
             return jsonify([False,
                            f"no class with classid {classid} exists"])
 
@@ -151,17 +1105,17 @@ def reg_details():
         prof_rows = cursor.fetchall()
         class_info["profnames"] = [row["profname"] for row in prof_rows]
 
-        conn.close()
         return jsonify([True, class_info])
 
-    except sqlite3.Error as e:
+    except (OSError, sqlite3.Error) as e:
         print(f"Database error: {e}", file=sys.stderr)
-        return jsonify([False, "A server error occurred. "
-                       "Please contact the system administrator."])
+        return jsonify([False, SERVER_ERROR_MESSAGE])
     except (ValueError, TypeError) as e:
         print(f"Input error: {e}", file=sys.stderr)
-        return jsonify([False, "A server error occurred. "
-                       "Please contact the system administrator."])
+        return jsonify([False, SERVER_ERROR_MESSAGE])
+    finally:
+        if conn is not None:
+            term.pool.release(conn)
 
 
 def main():
@@ -173,7 +1127,36 @@ def main():
     parser.add_argument(
         "port", type=int,
         help="the port at which the server should listen")
+    parser.add_argument(
+        "--maxresults", type=int, default=MAX_OVERVIEW_ROWS,
+        help="the most classes a search returns (default: %(default)s)")
+    parser.add_argument(
+        "--database", default=DATABASE,
+        help="the database file of the default term, "
+        f"{DEFAULT_TERM} (default: %(default)s)")
+    parser.add_argument(
+        "--accesslog", metavar="FILE",
+        help="the file to write a JSON access log to")
+    parser.add_argument(
+        "--term", action="append", default=[], metavar="NAME=DATABASE",
+        help="another term to serve and its database file; "
+        "may be repeated")
+    parser.add_argument(
+        "--ratelimit", type=float, default=RATE_LIMIT_PER_SECOND,
+        help="searches per second allowed per client, 0 for no limit "
+        "(default: %(default)s)")
     args = parser.parse_args()
+    if args.maxresults < 1:
+        parser.error("maxresults must be positive")
+    if args.ratelimit < 0:
+        parser.error("ratelimit must not be negative")
+    other_terms = [term.split("=", 1) for term in args.term]
+    for term in other_terms:
+        if len(term) != 2 or term[0].strip() in ("", DEFAULT_TERM, "all"):
+            parser.error(f"invalid term {'='.join(term)}")
+    configure(args.database, args.maxresults, args.ratelimit,
+              [(name.strip(), path) for name, path in other_terms],
+              args.accesslog)
     app.run(host="0.0.0.0", port=args.port, debug=False)
 
 if __name__ == "__main__":
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+"""
+Meeting-time queries over the classes table. Each class's days and
+times are parsed once into a day bitmask and an integer interval of
+minutes since midnight, and each day gets an index of meetings sorted
+by start time, so that time-window and conflict queries need no table
+scans or text parsing.
+"""
+
+import re
+import bisect
+from array import array
+
+DAY_BITS = {"M": 1, "T": 2, "W": 4, "Th": 8, "F": 16, "Sa": 32, "Su": 64}
+DAY_TOKEN = re.compile(r"Th|Sa|Su|M|T|W|F")
+TIME_FORMAT = re.compile(r"^(\d{1,2}):(\d{2})\s*([AaPp][Mm])?$")
+
+
+def parse_days(days):
+    """
+    Returns the bitmask of the days in a string such as "MWF" or
+    "TTh". Raises ValueError if days contains anything else.
+    """
+    days = (days or "").strip()
+    tokens = DAY_TOKEN.findall(days)
+    if "".join(tokens) != days:
+        raise ValueError(f"invalid days {days}")
+    mask = 0
+    for token in tokens:
+        mask |= DAY_BITS[token]
+    return mask
+
+
+def parse_time(text):
+    """
+    Returns the minutes since midnight of a time such as "01:30 PM"
+    or "13:30", or None if text is empty. Raises ValueError if text is
+    not a valid time.
+    """
+    text = (text or "").strip()
+    if text == "":
+        return None
+    match = TIME_FORMAT.match(text)
+    if match is None:
+        raise ValueError(f"invalid time {text}")
+    hours, minutes, meridiem = (int(match.group(1)), int(match.group(2)),
+                                match.group(3))
+    if meridiem is not None:
+        if not 1 <= hours <= 12:
+            raise ValueError(f"invalid time {text}")
+        hours = hours % 12 + (12 if meridiem.upper() == "PM" else 0)
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"invalid time {text}")
+    return hours * 60 + minutes
+
+
+class ScheduleIndex:
+    """
+    The meeting times of all classes, as parallel integer arrays, with
+    a per-day index of meetings sorted by start time.
+    """
+
+    def __init__(self, classes):
+        self.classids = array("i")
+        self.masks = array("b")
+        self.starts = array("h")
+        self.ends = array("h")
+        self.rows = array("h")
+        self._position = {}
+        for classid, days, starttime, endtime, rows in classes:
+            try:
+                mask = parse_days(days)
+                start = parse_time(starttime)
+                end = parse_time(endtime)
+            except ValueError:
+                mask = 0
+                start = end = None
+            if start is None or end is None or end <= start:
+                # No usable meeting time (e.g. to be announced).
+                mask, start, end = 0, 0, 0
+            self._position[classid] = len(self.classids)
+            self.classids.append(classid)
+            self.masks.append(mask)
+            self.starts.append(start)
+            self.ends.append(end)
+            self.rows.append(rows)
+
+        meeting = sorted((i for i in range(len(self.classids))
+                          if self.masks[i]),
+                         key=lambda i: self.starts[i])
+        self._by_start = (array("i", meeting),
+                          array("h", (self.starts[i] for i in meeting)))
+
+        # For each day: positions sorted by start, their starts, and
+        # the longest meeting, which bounds how far back an
+        # overlapping meeting can start.
+        self._days = {}
+        for bit in DAY_BITS.values():
+            positions = sorted(
+                (i for i in range(len(self.classids))
+                 if self.masks[i] & bit),
+                key=lambda i: self.starts[i])
+            longest = max((self.ends[i] - self.starts[i]
+                           for i in positions), default=0)
+            self._days[bit] = (array("i", positions),
+                               array("h", (self.starts[i]
+                                           for i in positions)),
+                               longest)
+
+    def __contains__(self, classid):
+        return classid in self._position
+
+    def _overlapping(self, bit, start, end):
+        """
+        Yields the positions of classes meeting on day bit during part
+        of the interval [start, end).
+        """
+        positions, starts, longest = self._days[bit]
+        lo = bisect.bisect_right(starts, start - longest)
+        hi = bisect.bisect_left(starts, end)
+        for k in range(lo, hi):
+            i = positions[k]
+            if self.ends[i] > start:
+                yield i
+
+    def conflicting(self, classids):
+        """
+        Returns the set of classids whose meetings overlap a meeting of
+        any of the given classids (including those classids).
+        """
+        found = set()
+        for classid in classids:
+            i = self._position[classid]
+            if self.masks[i] == 0:
+                continue
+            for bit in DAY_BITS.values():
+                if self.masks[i] & bit:
+                    found.update(self.classids[j] for j in
+                                 self._overlapping(bit, self.starts[i],
+                                                   self.ends[i]))
+        return found
+
+    def conflicts_within(self, classids):
+        """
+        Returns the sorted pairs of the given classids that conflict
+        with each other.
+        """
+        ordered = sorted(set(classids))
+        wanted = set(ordered)
+        pairs = set()
+        for classid in ordered:
+            for other in self.conflicting([classid]) & wanted:
+                if other != classid:
+                    pairs.add((min(classid, other), max(classid, other)))
+        return sorted(pairs)
+
+    def matching(self, days_mask=None, after=None, before=None):
+        """
+        Returns the classids of the classes that meet only on the days
+        in days_mask, start no earlier than after and end no later than
+        before (in minutes since midnight). A None argument does not
+        restrict the classes; with no restriction at all, classes
+        without a usable meeting time match too.
+        """
+        if days_mask is None and after is None and before is None:
+            return list(self.classids)
+        positions, starts = self._by_start
+        lo = 0 if after is None else bisect.bisect_left(starts, after)
+        hi = (len(starts) if before is None
+              else bisect.bisect_left(starts, before))
+        found = []
+        for k in range(lo, hi):
+            i = positions[k]
+            if days_mask is not None and self.masks[i] & ~days_mask:
+                continue
+            if before is not None and self.ends[i] > before:
+                continue
+            found.append(self.classids[i])
+        return found
+
+    def estimate_rows(self, classids):
+        """
+        Returns how many class overview rows belong to classids.
+        """
+        return sum(self.rows[self._position[classid]]
+                   for classid in classids if classid in self._position)
+
+
+def build_schedule_index(conn):
+    """
+    Builds a ScheduleIndex from the database connection conn.
+    """
+    return ScheduleIndex(conn.execute("""
+        SELECT cl.classid, cl.days, cl.starttime, cl.endtime,
+               COUNT(cr.courseid)
+        FROM classes cl
+        LEFT JOIN crosslistings cr ON cr.courseid = cl.courseid
+        GROUP BY cl.classid
+    """).fetchall())
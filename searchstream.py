@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""
+Server side of the incremental search channel. Each browser holds one
+search session: it posts query updates to the session and receives
+the results of the latest query over a Server-Sent Events stream. A
+query that is superseded while it runs is interrupted.
+"""
+
+import json
+import uuid
+import threading
+import contextlib
+
+
+def sse_event(event, data):
+    """
+    Formats one Server-Sent Event named event carrying data as JSON.
+    """
+    payload = json.dumps(data, separators=(",", ":"), sort_keys=True)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class SearchSession:
+    """
+    The latest query submitted by one client, plus the connection
+    running a query for it, so that a newer query can interrupt it.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._served = 0
+        self._query = None
+        self._conn = None
+
+    def submit(self, query):
+        """
+        Makes query the latest one and interrupts any query still
+        running for the session.
+        """
+        with self._cond:
+            self._generation += 1
+            self._query = query
+            if self._conn is not None:
+                self._conn.interrupt()
+            self._cond.notify_all()
+
+    def next_query(self, timeout):
+        """
+        Waits up to timeout seconds for a query that has not been
+        served yet. Returns (generation, query), or None on timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                    lambda: self._generation > self._served, timeout):
+                return None
+            self._served = self._generation
+            return (self._generation, self._query)
+
+    def is_current(self, generation):
+        """
+        Returns True if no newer query than generation was submitted.
+        """
+        with self._cond:
+            return generation == self._generation
+
+    @contextlib.contextmanager
+    def running(self, conn):
+        """
+        Registers conn as the connection running the session's query
+        for the duration of the block.
+        """
+        with self._cond:
+            self._conn = conn
+        try:
+            yield conn
+        finally:
+            with self._cond:
+                self._conn = None
+
+
+class SearchSessions:
+    """
+    The open search sessions, by session id.
+    """
+
+    def __init__(self, max_sessions):
+        self._max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self):
+        """
+        Opens a new session and returns (session_id, session), or None
+        if too many sessions are open.
+        """
+        with self._lock:
+            if len(self._sessions) >= self._max_sessions:
+                return None
+            session_id = uuid.uuid4().hex
+            session = SearchSession()
+            self._sessions[session_id] = session
+            return (session_id, session)
+
+    def get(self, session_id):
+        """
+        Returns the session with session_id, or None.
+        """
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def remove(self, session_id):
+        """
+        Closes the session with session_id.
+        """
+        with self._lock:
+            self._sessions.pop(session_id, None)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""
+Typeahead suggestions for the search fields. For each field, every
+prefix of every value in its (small, fixed) vocabulary is mapped to
+the best completions for it, so a lookup is a single dict access.
+"""
+
+from collections import defaultdict
+
+# The most completions stored for any prefix.
+MAX_SUGGESTIONS = 10
+
+
+class Vocabulary:
+    """
+    The values of one field with their weights, indexed by every
+    lowercase prefix. Completions are ranked by weight, then value.
+    """
+
+    def __init__(self, weighted_values):
+        ranked = sorted(((value, weight)
+                         for value, weight in weighted_values if value),
+                        key=lambda item: (-item[1], item[0]))
+        completions = defaultdict(list)
+        for value, weight in ranked:
+            key = value.lower()
+            for end in range(len(key) + 1):
+                matches = completions[key[:end]]
+                if len(matches) < MAX_SUGGESTIONS:
+                    matches.append({"value": value, "count": weight})
+        self._completions = dict(completions)
+
+    def complete(self, prefix, limit=MAX_SUGGESTIONS):
+        """
+        Returns up to limit completions of prefix, ignoring case.
+        """
+        return self._completions.get(prefix.lower(), [])[:limit]
+
+
+SUGGESTION_QUERIES = {
+    "dept": """
+        SELECT cr.dept, COUNT(DISTINCT cl.classid)
+        FROM crosslistings cr
+        JOIN classes cl ON cl.courseid = cr.courseid
+        GROUP BY cr.dept
+    """,
+    "coursenum": """
+        SELECT cr.coursenum, COUNT(DISTINCT cl.classid)
+        FROM crosslistings cr
+        JOIN classes cl ON cl.courseid = cr.courseid
+        GROUP BY cr.coursenum
+    """,
+    "area": """
+        SELECT c.area, COUNT(DISTINCT cl.classid)
+        FROM courses c
+        JOIN classes cl ON cl.courseid = c.courseid
+        GROUP BY c.area
+    """,
+}
+
+
+def build_suggestions(conn):
+    """
+    Builds a Vocabulary for each suggestable field from the database
+    connection conn, weighting each value by its number of classes.
+    """
+    return {field: Vocabulary(conn.execute(query).fetchall())
+            for field, query in SUGGESTION_QUERIES.items()}
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+"""
+The term databases served by the registrar application. Each term has
+its own database file and, while it is in use, its own pool of
+connections. Terms are opened on first use, and the least recently
+used ones are closed when too many are open.
+"""
+
+import pathlib
+import sqlite3
+import threading
+import contextlib
+from collections import OrderedDict
+from catalog import database_version
+
+
+class ConnectionPool:
+    """
+    Reusable connections to one database. Up to size idle connections
+    are kept; more are opened when needed and closed when returned.
+    Connections are opened on the current version of the database
+    file: once it is modified or replaced, the connections opened
+    before are closed instead of being reused.
+    """
+
+    def __init__(self, path, size):
+        self._path = path
+        self._uri = pathlib.Path(path).absolute().as_uri()
+        self._size = size
+        self._idle = []
+        self._versions = {}
+        self._version = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Returns a connection to the current database file for the
+        caller's exclusive use until it is passed to release. Raises
+        OSError if the file does not exist.
+        """
+        version = database_version(self._path)
+        stale = []
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                stale, self._idle = self._idle, []
+            conn = self._idle.pop() if self._idle else None
+        for old in stale:
+            self._discard(old)
+        if conn is not None:
+            conn.row_factory = None
+            return conn
+        conn = sqlite3.connect(f"{self._uri}?mode=ro", uri=True,
+                               check_same_thread=False,
+                               isolation_level=None)
+        with self._lock:
+            self._versions[conn] = version
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._versions.pop(conn, None)
+        conn.close()
+
+    def release(self, conn):
+        """
+        Returns conn to the pool, or closes it if the pool is full or
+        closed or the database has changed since conn was opened.
+        """
+        with self._lock:
+            if (not self._closed and len(self._idle) < self._size
+                    and self._versions.get(conn) == self._version):
+                self._idle.append(conn)
+                return
+        self._discard(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Lends a connection for the duration of the block.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """
+        Closes the idle connections. Connections in use are closed when
+        they are released.
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+class Term:
+    """
+    One open term: its name, database path and connection pool, and
+    how many cross-term searches are holding it open.
+    """
+
+    def __init__(self, name, path, pool_size):
+        self.name = name
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        self.holds = 0
+
+
+class Terms:
+    """
+    The terms served, by name, of which at most max_open are open at
+    once (more only while held by a cross-term search). on_close(path)
+    is called after a term is closed so that the caches and indexes of
+    its database can be dropped.
+    """
+
+    def __init__(self, paths, default, max_open, pool_size,
+                 on_close=None):
+        self._paths = dict(paths)
+        self.default = default
+        self._max_open = max_open
+        self._pool_size = pool_size
+        self._on_close = on_close
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    def names(self):
+        """
+        Returns the names of all terms, sorted.
+        """
+        return sorted(self._paths)
+
+    def _opened(self, name):
+        term = self._open.get(name)
+        if term is not None:
+            self._open.move_to_end(name)
+            return term
+        term = Term(name, self._paths[name], self._pool_size)
+        self._open[name] = term
+        return term
+
+    def _evict(self):
+        excess = len(self._open) - self._max_open
+        evicted = []
+        for name, term in list(self._open.items()):
+            if len(evicted) >= excess:
+                break
+            if term.holds == 0:
+                evicted.append(self._open.pop(name))
+        return evicted
+
+    def _close(self, evicted):
+        for term in evicted:
+            term.pool.close()
+            if self._on_close is not None:
+                self._on_close(term.path)
+
+    def get(self, name):
+        """
+        Returns the open Term called name (the default term if name is
+        empty), opening it and closing the least recently used term if
+        needed, or None if there is no such term.
+        """
+        name = name.strip() or self.default
+        if name not in self._paths:
+            return None
+        with self._lock:
+            term = self._opened(name)
+            evicted = self._evict()
+        self._close(evicted)
+        return term
+
+    @contextlib.contextmanager
+    def holding(self, names):
+        """
+        Opens the terms called names and yields them as a list, keeping
+        them open until the block exits. Raises KeyError if there is no
+        such term.
+        """
+        for name in names:
+            if name not in self._paths:
+                raise KeyError(name)
+        with self._lock:
+            held = [self._opened(name) for name in names]
+            for term in held:
+                term.holds += 1
+            evicted = self._evict()
+        self._close(evicted)
+        try:
+            yield held
+        finally:
+            with self._lock:
+                for term in held:
+                    term.holds -= 1
+                evicted = self._evict()
+            self._close(evicted)
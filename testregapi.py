@@ -8,21 +8,35 @@
 """
 Test script for the Registrar API endpoints.
 
-This program tests the JSON API routes (/regoverviews and /regdetails)
-of the registrar application by making HTTP requests and validating
-the responses. It tests various input combinations and error conditions
-to ensure the API behaves correctly according to the specification.
+This program tests the JSON API routes (/regoverviews, /regdetails,
+/regconflicts, /regroom, /regfreerooms, /regexport, /suggest, /regterms
+and /regprofs) of the registrar application by making HTTP requests and
+validating the responses. It tests various input combinations and
+error conditions to ensure the API behaves correctly according to the
+specification.
 """
 
+import io
 import sys
+import csv
+import shutil
+import sqlite3
+import gzip
 import json
 import argparse
 import pprint
+import urllib.error
 import urllib.request
 
 MAX_LINE_LENGTH = 72
 UNDERLINE = '-' * MAX_LINE_LENGTH
 
+# The cases expect the server to serve a second term, SECOND_TERM,
+# from a copy of the database without one class (see
+# make_second_term), so that results differ between the terms.
+SECOND_TERM = 'spring'
+SECOND_TERM_DELETED_CLASSID = 8321
+
 def parse_args():
     """
     Parses command-line arguments for the test script and returns the server URL.
@@ -33,12 +47,70 @@ def parse_args():
 
     parser.add_argument(
         'serverURL', metavar='serverURL', type=str,
-        help='the URL of the reg application')
+        help='the URL of the reg application, which should also serve '
+            + 'the term ' + SECOND_TERM + ' (see make_second_term)')
 
     args = parser.parse_args()
 
     return args.serverURL
 
+def make_second_term(database, path):
+    """
+    Writes the database of SECOND_TERM to path: a copy of database
+    without the class SECOND_TERM_DELETED_CLASSID.
+    """
+    shutil.copy(database, path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute('DELETE FROM classes WHERE classid = ?',
+                     (SECOND_TERM_DELETED_CLASSID,))
+        conn.commit()
+    finally:
+        conn.close()
+
+def count_export(body, mimetype):
+    """
+    Returns the number of classes in an export body of the given MIME
+    type and the classid of the first one.
+    """
+    text = body.decode('utf-8')
+    if mimetype == 'text/csv':
+        rows = list(csv.reader(io.StringIO(text)))
+        return (len(rows) - 1, int(rows[1][0]))
+    if mimetype == 'application/json':
+        doc = json.loads(text)
+        return (doc['rows'], doc['columns']['classid'][0])
+    lines = text.splitlines()
+    return (len(lines), json.loads(lines[0])['classid'])
+
+def check_export(serverurl, request, flo, body):
+    """
+    Summarizes an export response: its number of classes, the first
+    classid, whether the gzip-encoded export holds the same bytes, and
+    the status of a request revalidating it with its ETag.
+    """
+    mimetype = flo.headers.get_content_type()
+    records, first = count_export(body, mimetype)
+
+    gzip_request = urllib.request.Request(
+        serverurl + request, headers={'Accept-Encoding': 'gzip'})
+    with urllib.request.urlopen(gzip_request) as gzip_flo:
+        same = (gzip_flo.headers.get('Content-Encoding') == 'gzip'
+                and gzip.decompress(gzip_flo.read()) == body)
+
+    revalidate = urllib.request.Request(
+        serverurl + request,
+        headers={'If-None-Match': flo.headers.get('ETag')})
+    try:
+        with urllib.request.urlopen(revalidate) as again:
+            status = again.status
+    except urllib.error.HTTPError as ex:
+        status = ex.code
+
+    return {'mimetype': mimetype, 'classes': records,
+            'first classid': first, 'gzip matches': same,
+            'revalidation status': status}
+
 def run_test(serverurl, request):
     """
     Executes a single API test by making an HTTP request and printing results.
@@ -58,54 +130,86 @@ def run_test(serverurl, request):
     try:
         with urllib.request.urlopen(serverurl + request) as flo:
             response = flo.read()
-            json_doc = response.decode('utf-8')
-            response = json.loads(json_doc)
+            if flo.headers.get('Content-Disposition') is not None:
+                # A catalog export is summarized, not printed
+                response = check_export(serverurl, request, flo,
+                                        response)
+            else:
+                json_doc = response.decode('utf-8')
+                response = json.loads(json_doc)
         pp.pprint(response)
         sys.stdout.flush()
 
     except Exception as ex:
         print(sys.argv[0] + ': ' + str(ex), file=sys.stderr)
 
+TEST_CASES = [
+    '/regoverviews?dept=cos',
+    '/regoverviews?dept=COS&coursenum=2&area=qr&title=intro',
+    '/regoverviews?dept=&coursenum=&area=&title=',
+    '/regoverviews?dept=COS&coursenum=333',
+    '/regoverviews?area=qr',
+    '/regoverviews?title=programming',
+    '/regoverviews?dept=NONEXISTENT',
+    '/regdetails?classid=8321',
+    '/regdetails?classid=99999',
+    '/regdetails?classid=abc',
+    '/regdetails',
+    '/regdetails?classid=',
+    '/regoverviews?dept=COS&days=MW&after=10:00&before=12:00',
+    '/regoverviews?dept=COS&days=TTh&after=1:00pm',
+    '/regoverviews?dept=COS&coursenum=3&noconflict=8321',
+    '/regoverviews?days=XYZ',
+    '/regoverviews?after=25:00',
+    '/regoverviews?noconflict=abc',
+    '/regoverviews?noconflict=99999',
+    '/regconflicts?classids=8321,8324',
+    '/regconflicts?classids=8321,abc',
+    '/regconflicts?classids=8321,99999',
+    '/regroom?bldg=FRIEN&roomnum=006&days=TTh',
+    '/regroom?bldg=FRIEN&roomnum=006&days=T&time=11:30',
+    '/regroom?bldg=FRIEN&roomnum=006&days=T&time=10:00',
+    '/regroom?bldg=NOWHERE&roomnum=1',
+    '/regroom?bldg=FRIEN',
+    '/regfreerooms?days=MTWThF&after=9:00&before=17:00',
+    '/regfreerooms?after=10:00',
+    '/regfreerooms?after=12:00&before=11:00',
+    '/regexport',
+    '/regexport?format=csv',
+    '/regexport?format=columnar',
+    '/regexport?format=xml',
+    '/suggest?field=dept&prefix=co',
+    '/suggest?field=coursenum&prefix=33&limit=3',
+    '/suggest?field=area&prefix=',
+    '/suggest?field=dept&prefix=zzz',
+    '/suggest?field=dept&prefix=c&limit=abc',
+    '/suggest?field=title&prefix=intro',
+    '/regoverviews?dept=COS&noconflict=8321',
+    '/regterms',
+    '/regoverviews?term=spring&dept=COS&coursenum=333',
+    '/regoverviews?term=current&dept=COS&coursenum=333',
+    '/regoverviews?term=fall&dept=COS',
+    '/regdetails?classid=8321&term=spring',
+    '/regoverviews?terms=all&dept=COS&coursenum=333',
+    '/regoverviews?terms=current,spring&dept=COS&coursenum=4',
+    '/regoverviews?terms=spring,fall&dept=COS',
+    '/regoverviews?terms=,',
+    '/regoverviews?prof=kernighan',
+    '/regoverviews?prof=.',
+    '/regoverviews?dept=COS&prof=brian',
+    '/regoverviews?prof=zzzz',
+    '/regprofs?name=kern',
+    '/regprofs?name=h%C3%A9l%C3%A8ne',
+    '/regprofs?name=D%27ASPREMONT',
+]
+
 def main():
     """
     Main function that runs comprehensive API tests.
     """
     serverurl = parse_args()
-    request = '/regoverviews?dept=cos'
-    run_test(serverurl, request)
-
-    request = '/regoverviews?dept=COS&coursenum=2&area=qr&title=intro'
-    run_test(serverurl, request)
-
-    request = '/regoverviews?dept=&coursenum=&area=&title='
-    run_test(serverurl, request)
-    
-    request = '/regoverviews?dept=COS&coursenum=333'
-    run_test(serverurl, request)
-    
-    request = '/regoverviews?area=qr'
-    run_test(serverurl, request)
-    
-    request = '/regoverviews?title=programming'
-    run_test(serverurl, request)
-    
-    request = '/regoverviews?dept=NONEXISTENT'
-    run_test(serverurl, request)
-
-    request = '/regdetails?classid=8321'
-    run_test(serverurl, request)
-
-    request = '/regdetails?classid=99999'  
-    run_test(serverurl, request)
-    
-    request = '/regdetails?classid=abc'    
-    run_test(serverurl, request)
-    
-    request = '/regdetails'                 
-    run_test(serverurl, request)
-    
-    request = '/regdetails?classid='        
-    run_test(serverurl, request)
+    for request in TEST_CASES:
+        run_test(serverurl, request)
 
 if __name__ == '__main__':
     main()
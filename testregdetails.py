@@ -9,10 +9,10 @@ Browser automation test script for registrar class details
 """
 
 import sys
-import time
 import argparse
 import os
 import shutil
+import urllib.parse
 import playwright.sync_api
 
 MAX_LINE_LENGTH = 72
@@ -47,67 +47,115 @@ def print_flush(message):
     print(message)
     sys.stdout.flush()
 
+def is_response_to(path):
+    """
+    Returns a predicate matching successful responses to requests for
+    the given path.
+    """
+    def predicate(response):
+        return (urllib.parse.urlsplit(response.url).path == path
+                and response.status == 200)
+    return predicate
+
 def run_test(server_url, browser_process, classid):
     """
-    Execute a single browser test for class details model.
+    Execute a single browser test for class details model. Waits for
+    the server's responses instead of fixed timeouts.
     """
     print_flush(UNDERLINE)
 
     try:
         page = browser_process.new_page()
-        
+
         # Set up dialog handler to capture alerts
         dialog_message = None
-        
+
         def handle_dialog(dialog):
             nonlocal dialog_message
             dialog_message = dialog.message
             dialog.accept()
-        
+
         page.on("dialog", handle_dialog)
-        
+
         page.goto(server_url)
+        page.wait_for_function('() => overviewsShownFor !== null')
 
         # Check if link exists for this classid
         # For empty/whitespace classids, there may not be a link
         link_locator = page.get_by_text(classid).first
         link_count = link_locator.count()
-        
-        if link_count > 0:
-            link_locator.click()
-            
-            # Wait for either modal to appear (success) or dialog to appear (error)
-            # Try waiting for modal with timeout. Bootstrap 5 modals add 'show' class when visible
-            try:
-                # Wait for modal to become visible - check for 'show' class or visibility
-                page.wait_for_selector('#classDetailsModal.show', timeout=2000)
-                # Success case: modal opened, read the tables
-                page.wait_for_selector('#classDetailsTable')
+
+        if link_count > 0 and not link_locator.evaluate(
+                'element => element.matches(".btn-classid")'):
+            # The text is not a class button, so clicking it sends no
+            # request and shows no details
+            print_flush("No response received")
+        elif link_count > 0:
+            with page.expect_response(is_response_to('/regdetails')):
+                link_locator.click()
+            page.wait_for_function('() => detailsRequest === null')
+
+            if dialog_message:
+                print_flush(f"Error: {dialog_message}")
+            else:
+                # Bootstrap 5 modals add 'show' class when visible
+                page.wait_for_selector('#classDetailsModal.show')
                 class_details_table = page.locator('#classDetailsTable')
                 print_flush(class_details_table.inner_text())
 
-                page.wait_for_selector('#courseDetailsTable')
                 course_details_table = page.locator('#courseDetailsTable')
                 print_flush(course_details_table.inner_text())
-            except playwright.sync_api.TimeoutError:
-                # Modal didn't open - likely an error occurred
-                # Wait a bit for dialog to appear if it's slow
-                time.sleep(0.5)
-                if dialog_message:
-                    print_flush(f"Error: {dialog_message}")
-                else:
-                    # No modal and no dialog - unexpected state
-                    print_flush("No response received")
         else:
             # Link doesn't exist (e.g., empty/whitespace classid, invalid classid)
             # For these cases, we can't click a link, so just note it
             print_flush(f"No link found for classid: |{classid}|")
-        
+
         page.close()
 
     except Exception as ex:
         print(str(ex), file=sys.stderr)
 
+def break_database(path, fault):
+    """
+    Damages the database file at path: 'missing' deletes it and
+    'corrupted' overwrites it with garbage.
+    """
+    if fault == 'missing':
+        os.remove(path)
+    elif fault == 'corrupted':
+        with open(path, 'w') as f:
+            f.write('CORRUPTED DATA')
+
+TEST_CASES = [
+    '8321',
+    # normal class
+    '8321',
+    '7842', '7850', '7865', '7872', '7873',
+    # no professors
+    '7859', '7879', '7886', '7935', '8036',
+    # crosslisted courses
+    '7838', '7839', '7840', '7841', '7842',
+    # long descriptions
+    '7863', '8028', '8063', '8291', '8667',
+    # multiple crosslistings and professors
+    '8361',
+    # empty or whitespace class IDs
+    '', ' ', '   ', '\t', '\n',
+    # long class IDs
+    '123456789012345678901234567890',
+    # special characters in class IDs
+    '!@#$%', 'ABC#123', '123_456', 'class-8321',
+    # repeated queries
+    '8321', '8321', '8321',
+    # bad input
+    ' 8321', '8321 ', ' 8321 ',
+]
+
+# (fault, classid) cases run against a damaged copy of the database
+DATABASE_FAULT_CASES = [
+    ('missing', '8321'),
+    ('corrupted', '8321'),
+]
 
 def main():
     """
@@ -123,63 +171,15 @@ def main():
         else:
             browser_process = pw.firefox.launch()
 
-        run_test(server_url, browser_process, '8321')
-
-        # normal class
-        run_test(server_url, browser_process, '8321')
-
-        
-        for classId in ['7842', '7850', '7865', '7872', '7873']:
-            run_test(server_url, browser_process, classId)
-
-        # no professors
-        for classId in ['7859', '7879', '7886', '7935', '8036']:
-            run_test(server_url, browser_process, classId)
-
-        # crosslisted courses
-        for classId in ['7838', '7839', '7840', '7841', '7842']:
-            run_test(server_url, browser_process, classId)
-
-        # long descriptions
-        for classId in ['7863', '8028', '8063', '8291', '8667']:
-            run_test(server_url, browser_process, classId)
-
-        # multiple crosslistings and professors
-        run_test(server_url, browser_process, '8361')
-
-        # empty or whitespace class IDs
-        for classId in ['', ' ', '   ', '\t', '\n']:
-            run_test(server_url, browser_process, classId)
-
-        # long class IDs
-        run_test(server_url, browser_process, '123456789012345678901234567890')
-
-        # special characters in class IDs
-        for classId in ['!@#$%', 'ABC#123', '123_456', 'class-8321']:
-            run_test(server_url, browser_process, classId)
-
-        # repeated queries
-        for i in range(3):
-            run_test(server_url, browser_process, '8321')
-
-        # bad input
-        for classId in [' 8321', '8321 ', ' 8321 ']:
-            run_test(server_url, browser_process, classId)
-
-        # missing database
-        if os.path.exists('reg.sqlite'):
-            shutil.copy('reg.sqlite', 'reg_backup.sqlite')
-            os.remove('reg.sqlite')  
-            run_test(server_url, browser_process, '8321')
-            shutil.copy('reg_backup.sqlite', 'reg.sqlite') 
+        for classid in TEST_CASES:
+            run_test(server_url, browser_process, classid)
 
-        # corrupted database
-        if os.path.exists('reg.sqlite'):
-            shutil.copy('reg.sqlite', 'reg_backup.sqlite')
-            with open('reg.sqlite', 'w') as f:
-                f.write('CORRUPTED DATA')
-            run_test(server_url, browser_process, '8321')
-            shutil.copy('reg_backup.sqlite', 'reg.sqlite')       
+        for fault, classid in DATABASE_FAULT_CASES:
+            if os.path.exists('reg.sqlite'):
+                shutil.copy('reg.sqlite', 'reg_backup.sqlite')
+                break_database('reg.sqlite', fault)
+                run_test(server_url, browser_process, classid)
+                shutil.copy('reg_backup.sqlite', 'reg.sqlite')
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+
+#-----------------------------------------------------------------------
+# testreggolden.py
+# Authors: Nicole Deng and Ziya Momin
+#-----------------------------------------------------------------------
+
+"""
+Golden-output regression harness for the registrar application.
+
+Runs the API and browser test suites against a local server, compares
+their output with the captured golden files, and times every case
+against a per-case latency budget. Exits with status 1 if any output
+differs or any case has no budget or exceeds its budget by more than
+the allowed margin.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import difflib
+import argparse
+import contextlib
+import tempfile
+import statistics
+import urllib.request
+import testregapi
+import testregparallel
+
+BUDGETS_FILE = 'timingbudgets.json'
+
+# Budgets below this many seconds are too small to measure reliably.
+MIN_BUDGET_SECONDS = 0.01
+
+MAX_DIFF_LINES = 40
+
+GOLDEN_FILES = {
+    'api': 'out1',
+    'overviews': 'out4',
+    'details': 'out5',
+}
+
+def get_args():
+    """
+    Parses command-line arguments for the regression harness.
+    """
+    parser = argparse.ArgumentParser(
+        description='Compare the reg application test output with the '
+            + 'golden files and check per-case latency budgets')
+
+    parser.add_argument(
+        '--browser', choices=['firefox', 'chrome'],
+        help='the browser for the browser suites; without it only '
+            + 'the API suite runs')
+
+    parser.add_argument(
+        '--suites', nargs='+', choices=list(GOLDEN_FILES),
+        help='the suites to run (default: all that can run)')
+
+    parser.add_argument(
+        '--database', default='reg.sqlite',
+        help='the database the server should use')
+
+    parser.add_argument(
+        '--budgets', default=BUDGETS_FILE,
+        help='the JSON file of per-case budgets in seconds')
+
+    parser.add_argument(
+        '--margin', type=float, default=0.5,
+        help='how far (as a fraction) a case may exceed its budget '
+            + 'before failing (default: 0.5)')
+
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help='how many times to time each case; the median is checked '
+            + 'and the slowest recorded (default: 3)')
+
+    parser.add_argument(
+        '--record', action='store_true',
+        help='write the measured times to the budgets file instead '
+            + 'of checking them')
+
+    args = parser.parse_args()
+    if args.suites is None:
+        args.suites = ['api']
+        if args.browser is not None:
+            args.suites += ['overviews', 'details']
+    elif args.browser is None and set(args.suites) - {'api'}:
+        parser.error('the browser suites need --browser')
+    if args.repeat < 1:
+        parser.error('--repeat must be positive')
+    return args
+
+def time_request(url):
+    """
+    Returns how many seconds it takes to fetch url completely.
+    """
+    start = time.perf_counter()
+    with urllib.request.urlopen(url) as flo:
+        flo.read()
+    return time.perf_counter() - start
+
+def run_api_suite(server_url, repeat):
+    """
+    Runs the API test cases and returns (label, stdout, stderr,
+    times) tuples in case order, with the times of repeat fetches of
+    the response, which exclude printing it.
+    """
+    results = []
+    for index, request in enumerate(testregapi.TEST_CASES):
+        out = io.StringIO()
+        err = io.StringIO()
+        with contextlib.redirect_stdout(out), \
+                contextlib.redirect_stderr(err):
+            testregapi.run_test(server_url, request)
+        times = [time_request(server_url + request)
+                 for _ in range(repeat)]
+        results.append((f'{index}: {request}', out.getvalue(),
+                        err.getvalue(), times))
+    return results
+
+def run_browser_suite(suite, browser, server_url, database, repeat):
+    """
+    Runs the cases of a browser suite one at a time, so that their
+    timings are not skewed by each other, repeat times, and returns
+    (label, stdout, stderr, times) tuples in case order, with the
+    output of the first run and the time of each run.
+    """
+    cases = list(enumerate(testregparallel.all_cases(suite, database)))
+    runs = [sorted(testregparallel.run_shard(browser, server_url,
+                                             database, cases),
+                   key=lambda r: r[0])
+            for _ in range(repeat)]
+    labelled = []
+    for results in zip(*runs):
+        index, out, err, _ = results[0]
+        _, argument, fault = cases[index][1]
+        label = f'{index}: {argument!r}'
+        if fault is not None:
+            label += f' ({fault} database)'
+        labelled.append((label, out, err, [r[3] for r in results]))
+    return labelled
+
+def compare_with_golden(suite, output):
+    """
+    Compares output with the golden file of suite. Prints a diff and
+    returns False if they differ.
+    """
+    with open(GOLDEN_FILES[suite], encoding='utf-8') as f:
+        golden = f.read()
+    if output == golden:
+        print(f'{suite}: output matches {GOLDEN_FILES[suite]}')
+        return True
+
+    print(f'{suite}: output differs from {GOLDEN_FILES[suite]}')
+    diff = list(difflib.unified_diff(
+        golden.splitlines(), output.splitlines(),
+        GOLDEN_FILES[suite], suite, lineterm=''))
+    for line in diff[:MAX_DIFF_LINES]:
+        print('    ' + line)
+    if len(diff) > MAX_DIFF_LINES:
+        print(f'    ... {len(diff) - MAX_DIFF_LINES} more diff lines')
+    return False
+
+def check_budgets(suite, results, budgets, margin):
+    """
+    Prints each case's median time next to its budget. Returns False
+    if any case took longer than its budget allows or has no budget.
+    """
+    ok = True
+    suite_budgets = budgets.get(suite, {})
+    for label, _, _, times in results:
+        elapsed = statistics.median(times)
+        budget = suite_budgets.get(label)
+        if budget is None:
+            status = 'NO BUDGET (record one with --record)'
+            ok = False
+        else:
+            allowed = max(budget, MIN_BUDGET_SECONDS) * (1 + margin)
+            if elapsed > allowed:
+                status = f'OVER BUDGET (allowed {allowed:.4f}s)'
+                ok = False
+            else:
+                status = 'ok'
+        budget_text = '-' if budget is None else f'{budget:.4f}s'
+        print(f'    {elapsed:8.4f}s  budget {budget_text:>9}  '
+              f'{status}  {label}')
+    return ok
+
+def load_budgets(path):
+    """
+    Returns the budgets stored in path, or no budgets if it does not
+    exist.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def second_term_options(database, directory):
+    """
+    Writes the second term the API suite expects to directory and
+    returns the server options that serve it.
+    """
+    path = os.path.join(directory, testregapi.SECOND_TERM + '.sqlite')
+    testregapi.make_second_term(database, path)
+    return ('--term', f'{testregapi.SECOND_TERM}={path}')
+
+def main():
+    """
+    Runs the selected suites, checks their output and timings, and
+    exits with status 1 on any failure.
+    """
+    args = get_args()
+    budgets = load_budgets(args.budgets)
+    ok = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        options = second_term_options(args.database, directory)
+        with testregparallel.running_server(
+                args.database, *testregparallel.SERVER_OPTIONS,
+                *options) as server_url:
+            for suite in args.suites:
+                if suite == 'api':
+                    results = run_api_suite(server_url, args.repeat)
+                else:
+                    results = run_browser_suite(
+                        suite, args.browser, server_url, args.database,
+                        args.repeat)
+
+                output = ''.join(out for _, out, _, _ in results)
+                for label, _, err, _ in results:
+                    if err:
+                        print(f'{suite} {label}: {err.strip()}',
+                              file=sys.stderr)
+
+                ok = compare_with_golden(suite, output) and ok
+                if args.record:
+                    budgets[suite] = {label: round(max(times), 4)
+                                      for label, _, _, times in results}
+                else:
+                    ok = check_budgets(suite, results, budgets,
+                                       args.margin) and ok
+
+    if args.record:
+        with open(args.budgets, 'w', encoding='utf-8') as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'budgets written to {args.budgets}')
+
+    if not ok:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,7 @@ Browser automation test script for registrar class overviews
 import sys
 import time
 import argparse
+import urllib.parse
 import playwright.sync_api
 
 MAX_LINE_LENGTH = 72
@@ -49,9 +50,34 @@ def print_flush(message):
     print(message)
     sys.stdout.flush()
 
+def overviews_url(input_values):
+    """
+    Returns the /regoverviews URL that index.html requests for the
+    given input values.
+    """
+    params = []
+    for key in ('dept', 'coursenum', 'area', 'title'):
+        value = input_values.get(key, '').strip()
+        if value != '':
+            params.append(key + '='
+                + urllib.parse.quote(value, safe="-_.!~*'()"))
+    if not params:
+        return '/regoverviews'
+    return '/regoverviews?' + '&'.join(params)
+
+def wait_for_overviews(page, input_values):
+    """
+    Waits until the page shows the search results for input_values,
+    whether they came over the search stream or a plain request.
+    """
+    page.wait_for_function('url => overviewsShownFor === url',
+                           arg=overviews_url(input_values))
+
 def run_test(server_url, browser_process, delay, input_values):
     """
     Executes a single browser test with specified input values.
+    Waits for the search results rather than a fixed time; delay
+    adds an optional pause between interactions.
     """
 
     print_flush(UNDERLINE)
@@ -62,32 +88,33 @@ def run_test(server_url, browser_process, delay, input_values):
         page = browser_process.new_page()
         page.goto(server_url)
 
-        if 'dept' in input_values:
-            dept_input = page.locator('#deptInput')
-            dept_input.fill(input_values['dept'])
-            time.sleep(delay)
-
-        if 'coursenum' in input_values:
-            coursenum_input = page.locator('#coursenumInput')
-            coursenum_input.fill(input_values['coursenum'])
-            time.sleep(delay)
-
-        if 'area' in input_values:
-            area_input = page.locator('#areaInput')
-            area_input.fill(input_values['area'])
-            time.sleep(delay) 
-
-        if 'title' in input_values:
-            title_input = page.locator('#titleInput')
-            title_input.fill(input_values['title'])
-            time.sleep(delay) 
+        for key in ('dept', 'coursenum', 'area', 'title'):
+            if key in input_values:
+                page.locator('#' + key + 'Input').fill(
+                    input_values[key])
+                time.sleep(delay)
+        wait_for_overviews(page, input_values)
 
         overviews_table = page.locator('#overviewsTable')
         print_flush(overviews_table.inner_text())
+        page.close()
 
     except Exception as ex:
         print(str(ex), file=sys.stderr)
 
+TEST_CASES = [
+    {'dept':'COS'},
+    {'dept':'COS', 'coursenum':'2', 'area':'qr', 'title':'intro'},
+    {},
+    {'dept':'COS', 'coursenum':'333'},
+    {'area':'qr'},
+    {'title':'programming'},
+    {'dept':'MATH'},
+    {'dept':'NONEXISTENT'},
+    {'title':'introduction'},
+    {'dept':'AAS', 'area':'LA'},
+]
+
 def main():
     """
     Main function that runs comprehensive browser tests for class
@@ -102,34 +129,8 @@ def main():
         else:
             browser_process = pw.firefox.launch()
 
-        run_test(server_url, browser_process, delay,
-            {'dept':'COS'})
-        run_test(server_url, browser_process, delay,
-            {'dept':'COS', 'coursenum':'2', 'area':'qr',
-            'title':'intro'})
-
-        run_test(server_url, browser_process, delay, {})  
-        
-        run_test(server_url, browser_process, delay,
-            {'dept':'COS', 'coursenum':'333'})
-            
-        run_test(server_url, browser_process, delay,
-            {'area':'qr'})
-            
-        run_test(server_url, browser_process, delay,
-            {'title':'programming'})
-            
-        run_test(server_url, browser_process, delay,
-            {'dept':'MATH'})
-            
-        run_test(server_url, browser_process, delay,
-            {'dept':'NONEXISTENT'})  
-            
-        run_test(server_url, browser_process, delay,
-            {'title':'introduction'})
-            
-        run_test(server_url, browser_process, delay,
-            {'dept':'AAS', 'area':'LA'})
+        for input_values in TEST_CASES:
+            run_test(server_url, browser_process, delay, input_values)
 
 if __name__ == '__main__':
     main()
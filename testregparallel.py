@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+#-----------------------------------------------------------------------
+# testregparallel.py
+# Authors: Nicole Deng and Ziya Momin
+#-----------------------------------------------------------------------
+
+"""
+Parallel runner for the registrar browser tests.
+
+Starts one server, shards the cases of testregoverviews.py and
+testregdetails.py across several processes, runs each case in its own
+browser context, and prints the results in the original case order so
+that the output can be diffed against the captured outputs. Cases that
+damage the database run against their own server and database copy.
+"""
+
+import io
+import os
+import sys
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import urllib.request
+import concurrent.futures
+import playwright.sync_api
+import testregoverviews
+import testregdetails
+
+SERVER_STARTUP_TIMEOUT = 15
+
+# All workers connect from the same address, so per-client rate
+# limiting would only slow the run down.
+SERVER_OPTIONS = ('--ratelimit', '0')
+
+def get_args():
+    """
+    Parses command-line arguments for the parallel test runner.
+    """
+    parser = argparse.ArgumentParser(
+        description='Run the reg application browser tests in '
+            + 'parallel')
+
+    parser.add_argument(
+        'browser', metavar='browser', type=str,
+        choices=['firefox', 'chrome'],
+        help='the browser (firefox or chrome) that you want to use')
+
+    parser.add_argument(
+        '--suite', choices=['overviews', 'details', 'all'],
+        default='all', help='the test cases to run (default: all)')
+
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count() or 1,
+        help='the number of browser processes to run at once')
+
+    parser.add_argument(
+        '--database', default='reg.sqlite',
+        help='the database the server should use')
+
+    return parser.parse_args()
+
+def free_port():
+    """
+    Returns a TCP port that is currently free on this machine.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@contextlib.contextmanager
+def running_server(database, *options, processes=None):
+    """
+    Starts runserver.py on a free port serving database, with any
+    extra command-line options, waits until it answers, and yields its
+    URL. Stops the server on exit. If processes is a list, the server
+    process is appended to it.
+    """
+    port = free_port()
+    server_url = f'http://127.0.0.1:{port}'
+    here = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(here, 'runserver.py'), str(port),
+         '--database', os.path.abspath(database), *options],
+        cwd=here, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if processes is not None:
+        processes.append(process)
+    try:
+        deadline = time.monotonic() + SERVER_STARTUP_TIMEOUT
+        while True:
+            try:
+                with urllib.request.urlopen(server_url + '/index'):
+                    break
+            except OSError:
+                if process.poll() is not None or \
+                        time.monotonic() > deadline:
+                    raise RuntimeError('the server did not start')
+                time.sleep(0.1)
+        yield server_url
+    finally:
+        process.terminate()
+        process.wait()
+
+def all_cases(suite, database):
+    """
+    Returns the list of cases to run, in output order. Each case is a
+    tuple of its suite, its argument, and the database fault to apply
+    (or None).
+    """
+    cases = []
+    if suite in ('overviews', 'all'):
+        cases += [('overviews', input_values, None)
+                  for input_values in testregoverviews.TEST_CASES]
+    if suite in ('details', 'all'):
+        cases += [('details', classid, None)
+                  for classid in testregdetails.TEST_CASES]
+        if os.path.exists(database):
+            cases += [('details', classid, fault) for fault, classid
+                      in testregdetails.DATABASE_FAULT_CASES]
+    return cases
+
+def run_case(browser_process, server_url, case):
+    """
+    Runs one case in a fresh browser context and returns its captured
+    standard output and standard error and how many seconds it took.
+    """
+    suite, argument, _ = case
+    out = io.StringIO()
+    err = io.StringIO()
+    context = browser_process.new_context()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(out), \
+                contextlib.redirect_stderr(err):
+            if suite == 'overviews':
+                testregoverviews.run_test(server_url, context, 0,
+                                          argument)
+            else:
+                testregdetails.run_test(server_url, context, argument)
+    finally:
+        elapsed = time.perf_counter() - start
+        context.close()
+    return (out.getvalue(), err.getvalue(), elapsed)
+
+def run_shard(browser, server_url, database, shard):
+    """
+    Runs a shard of (index, case) pairs in one browser process and
+    returns (index, stdout, stderr, seconds) tuples. Cases with a
+    database fault get their own server on a damaged copy of database.
+    """
+    results = []
+    with playwright.sync_api.sync_playwright() as pw:
+        if browser == 'chrome':
+            browser_process = pw.chromium.launch()
+        else:
+            browser_process = pw.firefox.launch()
+
+        for index, case in shard:
+            fault = case[2]
+            if fault is None:
+                out, err, elapsed = run_case(browser_process,
+                                             server_url, case)
+            else:
+                with tempfile.TemporaryDirectory() as tmp:
+                    copy = os.path.join(tmp, 'reg.sqlite')
+                    shutil.copy(database, copy)
+                    testregdetails.break_database(copy, fault)
+                    with running_server(copy, *SERVER_OPTIONS) \
+                            as isolated_url:
+                        out, err, elapsed = run_case(
+                            browser_process, isolated_url, case)
+            results.append((index, out, err, elapsed))
+
+        browser_process.close()
+    return results
+
+def main():
+    """
+    Runs the selected browser test cases in parallel and prints their
+    output in case order.
+    """
+    args = get_args()
+    workers = max(1, args.workers)
+    cases = list(enumerate(all_cases(args.suite, args.database)))
+    shards = [cases[i::workers] for i in range(workers)]
+    shards = [shard for shard in shards if shard]
+
+    results = []
+    with running_server(args.database, *SERVER_OPTIONS) as server_url:
+        with concurrent.futures.ProcessPoolExecutor(len(shards)) as pool:
+            futures = [pool.submit(run_shard, args.browser, server_url,
+                                   args.database, shard)
+                       for shard in shards]
+            for future in futures:
+                results += future.result()
+
+    for _, out, err, _ in sorted(results,
+                                 key=lambda result: result[0]):
+        sys.stdout.write(out)
+        sys.stdout.flush()
+        sys.stderr.write(err)
+        sys.stderr.flush()
+
+if __name__ == '__main__':
+    main()